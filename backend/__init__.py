@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# Read .env once, before any backend module reads its settings with os.getenv
+load_dotenv()
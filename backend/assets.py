@@ -0,0 +1,107 @@
+import bisect
+import os
+import re
+from backend.audio_generator import load_voiceover_manifest
+from backend.media_info import mp3_file_duration
+
+
+_SCENE_FILE = re.compile(r"scene_(\d+)\.(png|mp3)$")
+
+
+class AssetIndex:
+    """Scene number -> generated assets, built once per run.
+
+    Each entry holds the scene's image and voiceover paths, the normalized
+    frames array when there is one, the voiceover duration and the cache keys
+    the assets were built from, so the renderer
+    looks scenes up in O(1) instead of scanning directories or probing files
+    one scene at a time.
+    """
+
+    def __init__(self):
+        self.scenes = {}
+        self._sorted = None
+
+    def _entry(self, scene_no):
+        self._sorted = None
+        return self.scenes.setdefault(scene_no, {
+            "image": None, "voiceover": None, "frames": None, "duration": None, "image_key": None, "voiceover_key": None,
+        })
+
+    def add_image(self, scene_no, path, key=None):
+        entry = self._entry(scene_no)
+        entry["image"], entry["image_key"] = str(path), key
+
+    def add_frames(self, scene_no, path):
+        """Normalized .npy of the scene's image (None drops a stale one)."""
+        self._entry(scene_no)["frames"] = str(path) if path is not None else None
+
+    def add_voiceover(self, scene_no, path, duration=None, key=None):
+        entry = self._entry(scene_no)
+        entry["voiceover"], entry["duration"], entry["voiceover_key"] = str(path), duration, key
+
+    def get(self, scene_no):
+        """Assets of one scene, or None if nothing was generated for it."""
+        return self.scenes.get(scene_no)
+
+    def duration(self, scene_no):
+        """Voiceover duration, read from the MP3 headers once if the manifest did not have it."""
+        entry = self.scenes.get(scene_no)
+        if entry is None or entry["voiceover"] is None:
+            return None
+        if entry["duration"] is None:
+            entry["duration"] = mp3_file_duration(entry["voiceover"])
+        return entry["duration"]
+
+    def closest(self, scene_no, kind="image"):
+        """Path of the `kind` asset whose scene number is nearest to `scene_no`."""
+        if self._sorted is None:
+            self._sorted = sorted(self.scenes)
+        numbers = [n for n in self._sorted if self.scenes[n][kind]]
+        if not numbers:
+            return None
+        i = bisect.bisect_left(numbers, scene_no)
+        candidates = numbers[max(0, i - 1):i + 1]
+        return self.scenes[min(candidates, key=lambda n: (abs(n - scene_no), n))][kind]
+
+    def __len__(self):
+        return len(self.scenes)
+
+    @classmethod
+    def from_manifest(cls, manifest, voiceover_folder):
+        """Index a run from its artifact manifest plus the voiceover durations manifest."""
+        index = cls()
+        durations = load_voiceover_manifest(voiceover_folder)
+        for name, artifact in manifest.artifacts().items():
+            kind, _, scene = name.partition(":")
+            if not scene.isdigit():
+                continue
+            path = manifest.run_dir / artifact["path"]
+            if not path.exists():
+                continue
+            if kind == "image":
+                index.add_image(int(scene), path, artifact["inputs"])
+            elif kind == "voiceover":
+                index.add_voiceover(int(scene), path, durations.get(int(scene)), artifact["inputs"])
+            elif kind == "frames":
+                index.add_frames(int(scene), path)
+        return index
+
+    @classmethod
+    def from_folders(cls, images_folder, voiceover_folder):
+        """Index scene_N.png / scene_N.mp3 files with one directory scan per folder."""
+        index = cls()
+        durations = load_voiceover_manifest(voiceover_folder) if voiceover_folder else {}
+        for folder in (images_folder, voiceover_folder):
+            if not folder or not os.path.isdir(folder):
+                continue
+            for entry in os.scandir(folder):
+                match = _SCENE_FILE.match(entry.name)
+                if not match:
+                    continue
+                scene_no = int(match.group(1))
+                if match.group(2) == "png":
+                    index.add_image(scene_no, entry.path)
+                else:
+                    index.add_voiceover(scene_no, entry.path, durations.get(scene_no))
+        return index
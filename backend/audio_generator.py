@@ -1,104 +1,191 @@
-import requests
-from backend.logging_config import setup_logging
-from dotenv import load_dotenv
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from backend.logging_config import setup_logging, submit_in_context
+from backend.cache import DiskCache, cache_key, write_atomic
+from backend.tts_backends import get_backend
+from backend.media_info import mp3_file_duration
+from backend.limits import resource_limits
+import json
 import os
 from pathlib import Path
-import re
 import time
-from gtts import gTTS
-from pydub import AudioSegment
 
 # Setup logging
 logger = setup_logging(log_file='app.log')
 
-# Load environment variables
-load_dotenv()
+# Voiceover lines synthesized at the same time
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', '4'))
 
-# Get the API key for Hugging Face
-HF_API_TOKEN = os.getenv('HF_API_TOKEN')
+# Retry backoff for failed TTS calls (seconds)
+TTS_BACKOFF_BASE = float(os.getenv('TTS_BACKOFF_BASE', '1.0'))
+TTS_BACKOFF_CAP = float(os.getenv('TTS_BACKOFF_CAP', '30.0'))
 
-API_URL_SD = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
+# Persistent cache of synthesized voiceover keyed by (text, language, engine)
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', str(Path(__file__).resolve().parent.parent / 'output/cache/tts'))
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(512 * 1024 ** 2)))
 
-# Headers with authentication
-headers = {"Authorization": f"Bearer {HF_API_TOKEN}"}
+tts_cache = DiskCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, suffix=".mp3")
 
-def extract_start_time(timestamp):
-    """Extracts the start time in seconds from a timestamp string (e.g., '00:10 - 00:20')."""
-    match = re.match(r"(\d{2}):(\d{2})", timestamp)
-    if match:
-        minutes, seconds = map(int, match.groups())
-        return minutes * 60 + seconds
-    return 0  # Default to 0 if parsing fails
+# Per-scene voiceover durations, written next to the mp3 files for the renderer
+VOICEOVER_MANIFEST = "voiceover_manifest.json"
 
-def generate_images_from_script(script_json, output_dir):
-    """Generate images for each scene based on the script JSON using Hugging Face API."""
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Loop through each scene and generate an image
-    for scene in script_json.get("scenes", []):
-        timestamp = scene.get("timestamp", "00:00")  # Default timestamp if missing
-        start_time = extract_start_time(timestamp)  # Convert timestamp to seconds
-        
-        prompt = (
-            f"A cinematic scene depicting {scene.get('scene_description', '')}. "
-            f"The environment includes {scene.get('character_object_details', '')}. "
-            f"The shot is taken using {scene.get('shot_type_camera_angle', '')} for dramatic effect. "
-            f"The mood of the scene is {scene.get('mood_emotion', '')}. "
-            f"Ultra-detailed, realistic, high-quality, professional lighting, dramatic composition."
-        )
-
-        output_path = f"{output_dir}/scene_{start_time}.png"  # Save with start_time in seconds
-        
-        # Prepare the request payload
-        payload = {"inputs": prompt}
+# Serialises manifest read-merge-write when scenes are voiced by concurrent calls
+_manifest_lock = threading.Lock()
+
+def write_voiceover_manifest(output_dir, durations):
+    """Write {scene number: {file, duration}} for the renderer."""
+    manifest = {
+        str(scene_no): {"file": f"scene_{scene_no}.mp3", "duration": round(duration, 3)}
+        for scene_no, duration in sorted(durations.items())
+    }
+    manifest_path = os.path.join(output_dir, VOICEOVER_MANIFEST)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"scenes": manifest}, f, indent=4)
+    return manifest_path
+
+def load_voiceover_manifest(voiceover_folder):
+    """Return {scene number: duration} from the voiceover manifest, or {} if there is none."""
+    manifest_path = os.path.join(voiceover_folder, VOICEOVER_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        scenes = json.load(f).get("scenes", {})
+    return {int(scene_no): entry["duration"] for scene_no, entry in scenes.items()}
 
+def _backoff_delay(attempt, base=TTS_BACKOFF_BASE, cap=TTS_BACKOFF_CAP):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def _synthesize_with_retry(backend, text, language, max_retries, backoff_base):
+    """Call backend.synthesize, retrying with jittered exponential backoff.
+
+    Each attempt holds a "tts" slot, shared by every job in the process; the
+    backoff sleep does not.
+    """
+    for attempt in range(max_retries):
         try:
-            response = requests.post(API_URL_SD, headers=headers, json=payload, timeout=60)  # Added timeout
-            
-            # Check if the response is successful
-            if response.status_code == 200:
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
-                logger.info(f"Image saved as {output_path}")
+            with resource_limits.slot("tts"):
+                return backend.synthesize(text, language)
+        except Exception as e:
+            if attempt < max_retries - 1:
+                delay = _backoff_delay(attempt, base=backoff_base)
+                logger.warning(f"Failed to generate audio for '{text[:40]}'. Retrying in {delay:.2f}s... ({attempt + 1}/{max_retries})")
+                time.sleep(delay)
             else:
-                logger.error(f"Error generating image for scene {start_time}: {response.json()}")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed for scene {start_time}: {str(e)}")
-    
-    logger.info("All images generated successfully.")
-
-def generate_audio(script_json, output_dir, language='en', max_retries=3):
-    """Generate audio from the voiceover text in the script JSON and save as mp3 files."""
+                logger.error(f"Failed after {max_retries} attempts: {e}")
+                raise
+
+def synthesize_lines(texts, language='en', backend=None, workers=TTS_WORKERS, max_retries=3, backoff_base=TTS_BACKOFF_BASE):
+    """Synthesize many lines concurrently.
+
+    Returns {text: (mp3_bytes, synthesis_seconds)}; raises if any line still
+    fails after max_retries.
+    """
+    backend = backend or get_backend()
+
+    def run(text):
+        start = time.perf_counter()
+        data = _synthesize_with_retry(backend, text, language, max_retries, backoff_base)
+        return data, time.perf_counter() - start
+
+    results = {}
+    if not texts:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {submit_in_context(executor, run, text): text for text in texts}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+def voiceover_key(text, language, backend_name):
+    """Hash identifying one synthesized voiceover line."""
+    return cache_key(text, language, backend_name)
+
+def share_voiceover(output_dir, source_scene, scene_no):
+    """Give scene `scene_no` the voiceover already generated for `source_scene`
+    (same line): link the file and copy its duration in the voiceover manifest."""
+    source_path = os.path.join(output_dir, f"scene_{source_scene}.mp3")
+    DiskCache.link_out(source_path, os.path.join(output_dir, f"scene_{scene_no}.mp3"))
+    with _manifest_lock:
+        durations = load_voiceover_manifest(output_dir)
+        durations[scene_no] = durations[source_scene]
+        write_voiceover_manifest(output_dir, durations)
+    logger.info(f"Voiceover for scene {scene_no} shared with scene {source_scene}")
+
+def generate_audio(script_json, output_dir, language='en', max_retries=3, use_cache=True, backend=None, workers=TTS_WORKERS, scenes=None):
+    """Generate audio from the voiceover text in the script JSON and save as mp3 files.
+
+    Identical voiceover lines are synthesized once per script, and lines seen in
+    earlier runs are served from the TTS cache. The remaining lines are sent to
+    the TTS backend by `workers` threads. Per-scene durations are read from the
+    MP3 frame headers and written to the voiceover manifest. `scenes` limits
+    the work to those 1-based scene numbers; durations already in the manifest
+    for the other scenes are kept. Returns a summary of how much synthesis was
+    skipped.
+    """
+    backend = backend or get_backend()
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    scenes = script_json.get("scenes", [])
-    for i, scene in enumerate(scenes):
-        timestamp = scene.get("timestamp", "00:00")  # Default timestamp if missing
-        start_time = extract_start_time(timestamp)  # Convert timestamp to seconds
-        voiceover_text = scene.get("voiceover", "").strip()
-        output_path = os.path.join(output_dir, f"scene_{i+1}.mp3")
 
+    # Group scenes by their voiceover text so duplicates are synthesized once
+    lines = {}
+    for i, scene in enumerate(script_json.get("scenes", [])):
+        if scenes is not None and i + 1 not in scenes:
+            continue
+        voiceover_text = scene.get("voiceover", "").strip()
         if not voiceover_text:
             logger.warning(f"Skipping scene {i+1}: No voiceover text provided.")
             continue
+        lines.setdefault(voiceover_text, []).append((i + 1, os.path.join(output_dir, f"scene_{i+1}.mp3")))
+
+    summary = {"scenes": 0, "synthesized": 0, "cache_hits": 0, "deduplicated": 0, "seconds_avoided": 0.0}
+    synthesis_seconds = {}
+    missing = []
+    for voiceover_text, scene_paths in lines.items():
+        key = voiceover_key(voiceover_text, language, backend.name)
+        if use_cache and tts_cache.fetch(key, scene_paths[0][1]):
+            synthesis_seconds[voiceover_text] = tts_cache.get_meta(key).get("synthesis_seconds", 0.0)
+            summary["cache_hits"] += 1
+            summary["seconds_avoided"] += synthesis_seconds[voiceover_text]
+            logger.info(f"Audio served from cache: {scene_paths[0][1]}")
+        else:
+            missing.append(voiceover_text)
+
+    synthesized = synthesize_lines(missing, language, backend, workers, max_retries)
+    for voiceover_text, (data, seconds) in synthesized.items():
+        output_path = lines[voiceover_text][0][1]
+        # Replace rather than overwrite: the old file may be a hard link to a
+        # cache entry or to another scene with the same line
+        write_atomic(output_path, data)
+        logger.info(f"Audio saved: {output_path}")
+
+        synthesis_seconds[voiceover_text] = seconds
+        summary["synthesized"] += 1
+        if use_cache:
+            tts_cache.put_bytes(voiceover_key(voiceover_text, language, backend.name), data, meta={"synthesis_seconds": round(seconds, 3)})
+
+    # Remaining scenes with the same line reuse the first file
+    durations = {}
+    for voiceover_text, scene_paths in lines.items():
+        first_path = scene_paths[0][1]
+        for _, path in scene_paths[1:]:
+            DiskCache.link_out(first_path, path)
+            summary["deduplicated"] += 1
+            summary["seconds_avoided"] += synthesis_seconds[voiceover_text]
+        summary["scenes"] += len(scene_paths)
+
+        # Duration from the MP3 frame headers, no ffmpeg decode needed
+        duration = mp3_file_duration(first_path)
+        if duration <= 0:
+            raise ValueError(f"Generated voiceover {first_path} contains no audio frames.")
+        logger.info(f"Voiceover {first_path} | Duration: {duration:.2f}s")
+        for scene_no, _ in scene_paths:
+            durations[scene_no] = duration
 
-        for attempt in range(max_retries):
-            try:
-                # Generate the TTS (Text-to-Speech) audio file
-                tts = gTTS(voiceover_text, lang=language)
-                tts.save(output_path)
-
-                # Load the audio file and check its validity
-                audio_clip = AudioSegment.from_file(output_path)
-                logger.info(f"Audio saved: {output_path} | Duration: {len(audio_clip) / 1000:.2f}s")
-
-                break  # Exit retry loop on success
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Failed to generate audio for scene {i+1}. Retrying... ({attempt + 1}/{max_retries})")
-                    time.sleep(5)  # Retry after waiting for 5 seconds
-                else:
-                    logger.error(f"Failed after {max_retries} attempts: {e}")
-                    raise
-
-    logger.info("All audio generation tasks completed.")
\ No newline at end of file
+    with _manifest_lock:
+        if scenes is not None:
+            durations = {**load_voiceover_manifest(output_dir), **durations}
+        write_voiceover_manifest(output_dir, durations)
+    summary["seconds_avoided"] = round(summary["seconds_avoided"], 2)
+    logger.info(f"All audio generation tasks completed. {summary} | TTS cache stats: {tts_cache.stats()}")
+    return summary
@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from backend.logging_config import setup_logging
+from backend.jobs import JobQueue, DONE, FAILED
+from backend.runs import run_video_pipeline, workspaces
+
+logger = setup_logging(log_file='app.log')
+
+
+# Pipeline runs a batch keeps going at once. Their script, image, TTS and music
+# calls share the process-wide endpoint limits, and renders beyond the render
+# limit wait, so this can be higher than the number of renders the CPU can take
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+
+# Topics accepted in one batch
+BATCH_MAX_TOPICS = int(os.getenv('BATCH_MAX_TOPICS', '100'))
+
+# Batches remembered for status lookups
+BATCH_HISTORY = int(os.getenv('BATCH_HISTORY', '20'))
+
+
+def clean_topics(topics):
+    """Non-empty topics, one per entry or per line of a multi-line entry."""
+    return [line.strip() for value in topics for line in value.splitlines() if line.strip()]
+
+
+class Batch:
+    """Topics generated together; results are published as each video finishes, in completion order."""
+
+    def __init__(self, batch_id, topics):
+        self.id = batch_id
+        self.topics = topics
+        self.jobs = {}  # topic index -> Job
+        self.results = []
+        self.created_at = time.time()
+        self.finished_at = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return len(self.results) == len(self.topics)
+
+    def videos_per_hour(self):
+        """Finished videos per hour of batch wall time so far."""
+        completed = sum(1 for result in self.results if result["status"] == DONE)
+        elapsed = (self.finished_at or time.time()) - self.created_at
+        return round(completed / elapsed * 3600, 1) if elapsed > 0 else None
+
+    def publish(self, index, job=None, error=None):
+        """Record the outcome of topic `index`; `job` is None if it never ran."""
+        result = {
+            "index": index,
+            "topic": self.topics[index],
+            "job_id": job.id if job else None,
+            "status": job.status if job else FAILED,
+            "video": f"/jobs/{job.id}/video" if job and job.status == DONE else None,
+            "error": job.error if job else error,
+            "seconds": round(job.finished_at - job.started_at, 3) if job and job.started_at else None,
+            "timings": {stage: round(seconds, 3) for stage, seconds in job.timings.items()} if job else {},
+        }
+        with self._cond:
+            self.results.append(result)
+            if self.done:
+                self.finished_at = time.time()
+                logger.info(f"Batch {self.id} finished: {self.summary()}")
+            self._cond.notify_all()
+
+    def wait(self, seen, timeout=None):
+        """Block until there are more than `seen` results (or the batch is done); returns the new ones."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.results) > seen or self.done, timeout=timeout)
+            return self.results[seen:]
+
+    def summary(self):
+        statuses = [result["status"] for result in self.results]
+        return {
+            "batch_id": self.id,
+            "topics": len(self.topics),
+            "done": statuses.count(DONE),
+            "failed": statuses.count(FAILED),
+            "pending": len(self.topics) - len(statuses),
+            "elapsed_s": round((self.finished_at or time.time()) - self.created_at, 3),
+            "videos_per_hour": self.videos_per_hour(),
+        }
+
+    def to_dict(self):
+        return dict(self.summary(), results=list(self.results))
+
+
+class BatchRunner:
+    """Runs batches of topics through one job queue shared by every batch.
+
+    A feeder thread per batch hands topics to the queue as workers free up,
+    so a batch of any size (up to `max_topics`) is accepted at once. Runs
+    share the inference client, caches and resource limits with every other
+    job in the process.
+    """
+
+    def __init__(self, max_workers=BATCH_WORKERS, max_topics=BATCH_MAX_TOPICS, history=BATCH_HISTORY):
+        self.jobs = JobQueue(max_workers=max_workers, max_queued=max_workers)
+        self.max_topics = max_topics
+        self.history = history
+        self._lock = threading.Lock()
+        self._batches = OrderedDict()
+
+    def submit(self, topics, use_script_cache=True):
+        """Start a batch and return it; raises ValueError for an empty or oversized topic list."""
+        topics = clean_topics(topics)
+        if not topics:
+            raise ValueError("A batch needs at least one topic.")
+        if len(topics) > self.max_topics:
+            raise ValueError(f"A batch takes at most {self.max_topics} topics, got {len(topics)}.")
+
+        batch = Batch(uuid.uuid4().hex, topics)
+        with self._lock:
+            self._batches[batch.id] = batch
+            while len(self._batches) > self.history:
+                self._batches.popitem(last=False)
+        threading.Thread(target=self._feed, args=(batch, use_script_cache), name=f"batch-{batch.id[:8]}", daemon=True).start()
+        logger.info(f"Batch {batch.id} queued with {len(topics)} topics")
+        return batch
+
+    def _feed(self, batch, use_script_cache):
+        for index, topic in enumerate(batch.topics):
+            if not workspaces.has_room():
+                batch.publish(index, error="Run workspaces are over their disk quota.")
+                continue
+            job = self.jobs.submit(run_video_pipeline, topic, use_script_cache=use_script_cache, description=topic, block=True)
+            batch.jobs[index] = job
+            job.future.add_done_callback(lambda _, index=index, job=job: batch.publish(index, job))
+
+    def get(self, batch_id):
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def get_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def shutdown(self, wait=True):
+        self.jobs.shutdown(wait=wait)
+
+
+def main():
+    """Generate videos for many topics from the command line, printing one JSON line per finished video."""
+    parser = argparse.ArgumentParser(description="Generate a batch of videos, one per topic.")
+    parser.add_argument("topics", nargs="*", help="topics; use --file for a list")
+    parser.add_argument("--file", help="text file with one topic per line")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--no-script-cache", action="store_true", help="always ask the model for fresh scripts")
+    args = parser.parse_args()
+
+    topics = list(args.topics)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            topics.append(f.read())
+
+    runner = BatchRunner(max_workers=args.workers, max_topics=max(BATCH_MAX_TOPICS, len(clean_topics(topics))))
+    try:
+        batch = runner.submit(topics, use_script_cache=not args.no_script_cache)
+    except ValueError as e:
+        parser.error(str(e))
+    seen = 0
+    while seen < len(batch.topics):
+        for result in batch.wait(seen):
+            result = dict(result, video=str(batch.jobs[result["index"]].result) if result["status"] == DONE else None)
+            print(json.dumps(dict(result, videos_per_hour=batch.videos_per_hour()), ensure_ascii=False), flush=True)
+            seen += 1
+    print(json.dumps(batch.summary()), flush=True)
+    runner.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from backend.logging_config import setup_logging
+
+logger = setup_logging(log_file='app.log')
+
+
+def cache_key(*parts):
+    """Stable SHA-256 key for any JSON-serialisable parts (URL, prompt, params...)."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def write_atomic(path, data):
+    """Write bytes to path through a temp file and os.replace.
+
+    The old file is replaced, never written into, so hard links to it (cache
+    entries materialised with DiskCache.fetch) keep their content.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class DiskCache:
+    """Content-addressed on-disk cache with a size bound and LRU eviction.
+
+    Entries live at <root>/<key[:2]>/<key><suffix>. Writes go to a temporary
+    file in the same directory and are moved into place with os.replace, so a
+    reader never sees a partial entry. Recency is tracked in memory and
+    mirrored to the file mtime so it survives restarts. Small JSON metadata
+    can be attached to an entry and is kept in <root>/meta.json.
+    """
+
+    def __init__(self, root, max_bytes, suffix=""):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._size = 0
+        self._meta = {}
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for path in self.root.glob(f"??/*{self.suffix}"):
+            if path.name.startswith("."):
+                continue
+            stat = path.stat()
+            key = path.name[:len(path.name) - len(self.suffix)] if self.suffix else path.name
+            found.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+        meta_path = self.root / "meta.json"
+        if meta_path.exists():
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                self._meta = {key: value for key, value in meta.items() if key in self._entries}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable cache metadata {meta_path}: {e}")
+
+    def _save_meta(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, self.root / "meta.json")
+
+    def path_for(self, key):
+        return self.root / key[:2] / f"{key}{self.suffix}"
+
+    def _touch(self, key):
+        self._entries.move_to_end(key)
+        try:
+            os.utime(self.path_for(key))
+        except OSError:
+            pass
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get_path(self, key):
+        """Return the cached file path for key (and mark it used), or None on a miss."""
+        with self._lock:
+            if key in self._entries and self.path_for(key).exists():
+                self.hits += 1
+                self._touch(key)
+                return self.path_for(key)
+            if key in self._entries:
+                # Removed behind our back
+                self._size -= self._entries.pop(key)
+            self.misses += 1
+            return None
+
+    def get_meta(self, key):
+        """Metadata stored alongside key, or an empty dict."""
+        with self._lock:
+            return dict(self._meta.get(key, {}))
+
+    def get_bytes(self, key):
+        path = self.get_path(key)
+        return path.read_bytes() if path else None
+
+    def fetch(self, key, dest_path):
+        """Materialise a cached entry at dest_path, hard-linking when possible.
+
+        Returns True on a hit, False on a miss.
+        """
+        path = self.get_path(key)
+        if path is None:
+            return False
+        self.link_out(path, dest_path)
+        return True
+
+    @staticmethod
+    def link_out(path, dest_path):
+        """Hard-link (or copy, across filesystems) a cache entry to dest_path.
+
+        The link is made under a temp name and swapped in with os.replace, so an
+        existing dest_path is replaced, never written into; other links to its
+        old content are left alone.
+        """
+        dest_path = Path(dest_path)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dest_path.parent, prefix=".tmp-")
+        os.close(fd)
+        os.unlink(tmp_path)
+        try:
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                # Different filesystem or links not supported
+                shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def put_bytes(self, key, data, meta=None):
+        """Store data under key atomically; returns the entry path."""
+        path = self.path_for(key)
+        write_atomic(path, data)
+        self._record(key, len(data), meta)
+        return path
+
+    def put_file(self, key, src_path, meta=None):
+        """Copy an existing file into the cache atomically; returns the entry path."""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._record(key, path.stat().st_size, meta)
+        return path
+
+    def _record(self, key, size, meta=None):
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries[key]
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            self._size += size
+            meta_changed = self._evict()
+            if meta is not None:
+                self._meta[key] = meta
+                meta_changed = True
+            if meta_changed:
+                self._save_meta()
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes; True if metadata changed."""
+        meta_changed = False
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            if self._meta.pop(key, None) is not None:
+                meta_changed = True
+            try:
+                self.path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evicted cache entry {key} ({size} bytes) from {self.root}")
+        return meta_changed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,396 @@
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from backend.logging_config import setup_logging, submit_in_context
+from backend.media_info import image_size
+
+logger = setup_logging(log_file='app.log')
+
+
+# ffmpeg processes used by render_parallel (one scene segment each)
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', str(os.cpu_count() or 1)))
+
+# Zoom used for pans so there is headroom to move the frame (matches MoviePy's 10% pan)
+PAN_ZOOM = 1 / 0.9
+
+# Extra zoom per second, centred on the frame, added by the "zoom out" transition (matches MoviePy)
+TRANSITION_ZOOM_RATE = 0.05
+
+# Upscale factor applied before zoompan; >1 hides its integer-pixel jitter at extra CPU cost
+ZOOMPAN_OVERSAMPLE = 1
+
+MUSIC_VOLUME = 0.3
+
+# Fragmented MP4: an empty moov up front, then self-contained fragments that a
+# client can play while the rest of the file is still being written
+FRAGMENTED_MOVFLAGS = "frag_keyframe+empty_moov+default_base_moof"
+
+# Keyframe (and so fragment) interval in seconds for fragmented output
+FRAGMENT_SECONDS = 2
+
+
+def ffmpeg_binary():
+    """ffmpeg on PATH, else the binary bundled with imageio-ffmpeg (which MoviePy uses)."""
+    binary = shutil.which("ffmpeg")
+    if binary:
+        return binary
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def _even(value):
+    return int(value) - int(value) % 2
+
+
+def _zoompan_expressions(motion, progress, extra_zoom=None):
+    """(zoom, x, y) zoompan expressions for a Ken Burns motion; `progress` runs 0 -> 1 over the scene.
+
+    `extra_zoom` is an expression for a further zoom centred on the frame
+    (the "zoom out" transition), applied on top of the motion.
+    """
+    zoom, x, y = _ken_burns_expressions(motion, progress)
+    if extra_zoom is None:
+        return zoom, x, y
+    # Shrink the motion's window around its own centre; x/y may not use zoompan's
+    # `zoom`, which would now include the extra factor
+    base = f"({zoom})"
+    x, y = x.replace("zoom", base), y.replace("zoom", base)
+    total = f"{base}*{extra_zoom}"
+    return total, f"({x})+iw/{base}/2-iw/({total})/2", f"({y})+ih/{base}/2-ih/({total})/2"
+
+
+def _ken_burns_expressions(motion, progress):
+    effect, zoom = motion["effect"], motion["zoom"]
+    p = f"({progress})"
+    center_x, center_y = "iw/2-iw/zoom/2", "ih/2-ih/zoom/2"
+    if effect == "in":
+        return f"1+{zoom - 1:.4f}*{p}", center_x, center_y
+    if effect == "out":
+        return f"{zoom:.4f}-{zoom - 1:.4f}*{p}", center_x, center_y
+    if effect == "left":
+        return f"{PAN_ZOOM:.4f}", f"(iw-iw/zoom)*{p}", center_y
+    if effect == "right":
+        return f"{PAN_ZOOM:.4f}", f"(iw-iw/zoom)*(1-{p})", center_y
+    if effect == "up":
+        return f"{PAN_ZOOM:.4f}", center_x, f"(ih-ih/zoom)*{p}"
+    if effect == "down":
+        return f"{PAN_ZOOM:.4f}", center_x, f"(ih-ih/zoom)*(1-{p})"
+    return "1", "0", "0"
+
+
+def _fade_filters(transition, duration):
+    """ffmpeg fade filters matching the MoviePy transition handling."""
+    if transition == "fade-in":
+        return ["fade=t=in:st=0:d=1"]
+    if transition == "crossfade":
+        return ["fade=t=in:st=0:d=1", f"fade=t=out:st={max(0.0, duration - 1):.3f}:d=1"]
+    if transition == "quick cuts":
+        return [f"fade=t=out:st={max(0.0, duration - 0.5):.3f}:d=0.5"]
+    return []
+
+
+def _scene_chains(entry, size, fps, image_input, audio_input, video_label, audio_label):
+    """Filter chains turning one image + voiceover into a scene of exactly its planned length."""
+    width, height = size
+    frames = max(1, round(entry["duration"] * fps))
+    duration = frames / fps
+    extra_zoom = f"(1+{TRANSITION_ZOOM_RATE}*on/{fps})" if entry["transition"] == "zoom out" else None
+    zoom, x, y = _zoompan_expressions(entry["ken_burns"], f"on/{max(frames - 1, 1)}", extra_zoom)
+    video = [
+        f"scale={width * ZOOMPAN_OVERSAMPLE}:{height * ZOOMPAN_OVERSAMPLE}:force_original_aspect_ratio=increase",
+        f"crop={width * ZOOMPAN_OVERSAMPLE}:{height * ZOOMPAN_OVERSAMPLE}",
+        f"zoompan=z='{zoom}':x='{x}':y='{y}':d={frames}:s={width}x{height}:fps={fps}",
+        "setsar=1",
+        "format=yuv420p",
+        *_fade_filters(entry["transition"], duration),
+    ]
+    return [
+        f"[{image_input}:v]{','.join(video)}[{video_label}]",
+        f"[{audio_input}:a]aresample=44100,aformat=channel_layouts=stereo,"
+        f"apad,atrim=0:{duration:.3f},asetpts=N/SR/TB[{audio_label}]",
+    ]
+
+
+def _timeline_seconds(plan, fps):
+    """Length of the rendered timeline: every scene is a whole number of frames."""
+    return sum(max(1, round(entry["duration"] * fps)) for entry in plan) / fps
+
+
+def _music_input_args(bg_music_path, music_duration=None, timeline=None):
+    """Music input looped by the demuxer, so nothing is re-encoded.
+
+    With the track's duration (from music.json) it is looped just enough times
+    to cover `timeline`; without it, forever, and the trim in _music_chains
+    ends it.
+    """
+    loops = -1
+    if music_duration and timeline:
+        loops = max(0, math.ceil(timeline / music_duration) - 1)
+    return ["-stream_loop", str(loops), "-i", str(bg_music_path)]
+
+
+def _music_chains(music_input, voice_label, timeline):
+    return [
+        f"[{music_input}:a]volume={MUSIC_VOLUME},aresample=44100,aformat=channel_layouts=stereo,"
+        f"atrim=0:{timeline:.3f}[bg]",
+        f"[{voice_label}][bg]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]",
+    ]
+
+
+def build_filter_graph(plan, size, fps, music_input=None):
+    """Build the filter_complex script for a scene plan.
+
+    Inputs are expected in order image_0, voiceover_0, image_1, voiceover_1, ...
+    followed by the music input (index `music_input`) when there is one.
+    Returns the graph text; outputs are labelled [vout] and [aout].
+    """
+    chains = []
+    concat_inputs = []
+    for i, entry in enumerate(plan):
+        chains += _scene_chains(entry, size, fps, 2 * i, 2 * i + 1, f"v{i}", f"a{i}")
+        concat_inputs.append(f"[v{i}][a{i}]")
+
+    voice_label = "aout" if music_input is None else "voice"
+    chains.append(f"{''.join(concat_inputs)}concat=n={len(plan)}:v=1:a=1[vout][{voice_label}]")
+    if music_input is not None:
+        chains += _music_chains(music_input, voice_label, _timeline_seconds(plan, fps))
+    return ";\n".join(chains)
+
+
+def _container_args(fps, fragmented):
+    """Muxer flags: faststart for a finished file, short keyframe-aligned fragments for streaming."""
+    if fragmented:
+        return ["-g", str(fps * FRAGMENT_SECONDS), "-movflags", FRAGMENTED_MOVFLAGS]
+    return ["-movflags", "+faststart"]
+
+
+def _run_ffmpeg(args, description):
+    command = [ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", *args]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg {description} exited with {result.returncode}: {result.stderr.strip()[-2000:]}")
+
+
+def _output_size(plan, size):
+    if size is None:
+        size = image_size(plan[0]["image"])
+        if size is None:
+            raise ValueError(f"Unable to read image size of {plan[0]['image']}")
+    return (_even(size[0]), _even(size[1]))  # libx264 + yuv420p need even dimensions
+
+
+def render_with_ffmpeg(plan, bg_music_path, output_video_path, size=None, fps=24, fragmented=False, music_duration=None):
+    """Render a scene plan with one native ffmpeg invocation (zoompan + fade + concat + amix).
+
+    `size` defaults to the first scene's image size, which is what MoviePy's
+    compose concatenation produces for same-sized SDXL images. With
+    `fragmented` the MP4 is written as it is encoded, so the first scenes can
+    be streamed before the render finishes.
+    """
+    if not plan:
+        raise ValueError("No valid video clips created. Check if images and audio exist.")
+
+    size = _output_size(plan, size)
+
+    inputs = []
+    for entry in plan:
+        inputs += ["-i", entry["image"], "-i", entry["audio"]]
+    music_input = None
+    if bg_music_path and os.path.exists(bg_music_path):
+        music_input = len(plan) * 2
+        inputs += _music_input_args(bg_music_path, music_duration, _timeline_seconds(plan, fps))
+
+    graph = build_filter_graph(plan, size, fps, music_input)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as graph_file:
+        graph_file.write(graph)
+
+    logger.info(f"Rendering {len(plan)} scenes with ffmpeg to {output_video_path}")
+    try:
+        _run_ffmpeg([
+            *inputs,
+            "-filter_complex_script", graph_file.name,
+            "-map", "[vout]", "-map", "[aout]",
+            "-r", str(fps),
+            "-c:v", "libx264", "-pix_fmt", "yuv420p",
+            "-c:a", "aac",
+            *_container_args(fps, fragmented),
+            str(output_video_path),
+        ], "render")
+    finally:
+        os.unlink(graph_file.name)
+    logger.info(f"Final video written to {output_video_path}")
+
+
+def render_scene_segment(entry, segment_path, size, fps=24, fragmented=False):
+    """Render one scene (Ken Burns, fades, voiceover) to an intermediate segment.
+
+    Segments carry H.264 video and PCM audio in Matroska so they can be joined
+    with a stream copy and no AAC priming gaps between scenes.
+    """
+    graph = ";".join(_scene_chains(entry, size, fps, 0, 1, "vout", "aout"))
+    _run_ffmpeg([
+        "-i", entry["image"], "-i", entry["audio"],
+        "-filter_complex", graph,
+        "-map", "[vout]", "-map", "[aout]",
+        "-r", str(fps),
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-threads", "1",
+        *(["-g", str(fps * FRAGMENT_SECONDS)] if fragmented else []),
+        "-c:a", "pcm_s16le",
+        str(segment_path),
+    ], f"segment for scene {entry['scene']}")
+    return segment_path
+
+
+def render_parallel(plan, bg_music_path, output_video_path, size=None, fps=24, workers=RENDER_WORKERS, fragmented=False, music_duration=None):
+    """Render each scene to its own segment concurrently, then stream-copy concat and mix music.
+
+    Every segment is a separate single-threaded ffmpeg process, so render time
+    scales with the number of cores up to `workers`.
+    """
+    if not plan:
+        raise ValueError("No valid video clips created. Check if images and audio exist.")
+    size = _output_size(plan, size)
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_video_path))) as tmp_dir:
+        segment_paths = [os.path.join(tmp_dir, f"segment_{i:04d}.mkv") for i in range(len(plan))]
+        logger.info(f"Rendering {len(plan)} scene segments with {workers} workers")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [submit_in_context(executor, render_scene_segment, entry, path, size, fps, fragmented) for entry, path in zip(plan, segment_paths)]
+            for future in futures:
+                future.result()
+
+        list_path = os.path.join(tmp_dir, "segments.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{path}'\n" for path in segment_paths)
+
+        # Video is copied as-is; only the audio is mixed and encoded in the final pass
+        inputs = ["-f", "concat", "-safe", "0", "-i", list_path]
+        if bg_music_path and os.path.exists(bg_music_path):
+            timeline = _timeline_seconds(plan, fps)
+            inputs += _music_input_args(bg_music_path, music_duration, timeline)
+            audio_args = ["-filter_complex", ";".join(_music_chains(1, "0:a", timeline)), "-map", "0:v", "-map", "[aout]"]
+        else:
+            audio_args = ["-map", "0:v", "-map", "0:a"]
+        _run_ffmpeg([
+            *inputs,
+            *audio_args,
+            "-c:v", "copy",
+            "-c:a", "aac",
+            "-movflags", FRAGMENTED_MOVFLAGS if fragmented else "+faststart",
+            str(output_video_path),
+        ], "concat")
+    logger.info(f"Final video written to {output_video_path}")
+
+
+def _fade_factor(transition, t, duration):
+    """Brightness multiplier at time t, matching _fade_filters (1.0 = untouched)."""
+    factor = 1.0
+    if transition in ("fade-in", "crossfade"):
+        factor = min(factor, t / 1.0)
+    if transition == "crossfade":
+        factor = min(factor, (duration - t) / 1.0)
+    if transition == "quick cuts":
+        factor = min(factor, (duration - t) / 0.5)
+    return max(0.0, factor)
+
+
+def _append_voiceover(entry, duration, voice_file):
+    """Decode one voiceover, padded or trimmed to exactly `duration`, as raw PCM onto `voice_file`."""
+    command = [
+        ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-i", entry["audio"],
+        "-af", f"aresample=44100,aformat=channel_layouts=stereo,apad,atrim=0:{duration:.6f}",
+        "-f", "s16le", "-ar", "44100", "-ac", "2", "pipe:1",
+    ]
+    result = subprocess.run(command, stdout=voice_file, stderr=subprocess.PIPE, text=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg voiceover for scene {entry['scene']} exited with {result.returncode}: {result.stderr.decode(errors='replace')[-2000:]}")
+
+
+def render_streaming(plan, bg_music_path, output_video_path, size=None, fps=24, fragmented=False, music_duration=None):
+    """Render a scene plan with memory that stays flat however many scenes there are.
+
+    Voiceovers are decoded one scene at a time into a single PCM track, which
+    is mixed with the music and encoded on its own. Then one ffmpeg encoder is
+    fed raw frames on stdin, generated scene by scene with KenBurnsFrames. Only
+    the active scene's image and trajectory are held, and each scene is
+    released before the next is loaded. Transitions are fades within a scene,
+    so no neighbouring scene has to be materialized. Scenes with a normalized
+    array (entry["frames"]) are memory-mapped instead of decoding the PNG.
+    """
+    import numpy as np
+    import cv2
+    from backend.ken_burns import KenBurnsFrames, transition_zoom_rate
+
+    if not plan:
+        raise ValueError("No valid video clips created. Check if images and audio exist.")
+    width, height = size = _output_size(plan, size)
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_video_path))) as tmp_dir:
+        voice_path = os.path.join(tmp_dir, "voice.pcm")
+        with open(voice_path, "wb") as voice_file:
+            for entry in plan:
+                frames = max(1, round(entry["duration"] * fps))
+                _append_voiceover(entry, frames / fps, voice_file)
+                voice_file.flush()
+
+        # Mix and encode the soundtrack first. The encoder below then copies AAC
+        # packets, so only compressed audio waits in its muxing queue for the
+        # (much slower) video frames, instead of minutes of decoded PCM
+        audio_path = os.path.join(tmp_dir, "audio.m4a")
+        audio_inputs = ["-f", "s16le", "-ar", "44100", "-ac", "2", "-i", voice_path]
+        if bg_music_path and os.path.exists(bg_music_path):
+            timeline = _timeline_seconds(plan, fps)
+            audio_inputs += _music_input_args(bg_music_path, music_duration, timeline)
+            mix_args = ["-filter_complex", ";".join(_music_chains(1, "0:a", timeline)), "-map", "[aout]"]
+        else:
+            mix_args = ["-map", "0:a"]
+        _run_ffmpeg([*audio_inputs, *mix_args, "-c:a", "aac", audio_path], "soundtrack")
+        os.unlink(voice_path)
+
+        command = [
+            ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "pipe:0",
+            "-i", audio_path,
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p",
+            "-c:a", "copy",
+            *_container_args(fps, fragmented),
+            str(output_video_path),
+        ]
+        logger.info(f"Streaming {len(plan)} scenes to ffmpeg for {output_video_path}")
+        with tempfile.TemporaryFile() as stderr:
+            encoder = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr)
+            buffer = np.empty((height, width, 3), dtype=np.uint8)
+            try:
+                for entry in plan:
+                    frames = max(1, round(entry["duration"] * fps))
+                    duration = frames / fps
+                    scene = KenBurnsFrames(
+                        entry.get("frames") or entry["image"], duration, entry["ken_burns"], fps=fps, size=size,
+                        zoom_rate=transition_zoom_rate(entry["transition"]),
+                    )
+                    for i in range(frames):
+                        t = i / fps
+                        factor = _fade_factor(entry["transition"], t, duration)
+                        if factor < 1.0:
+                            cv2.convertScaleAbs(scene.frame(t), dst=buffer, alpha=factor)
+                        else:
+                            np.copyto(buffer, scene.frame(t))
+                        encoder.stdin.write(buffer.data)
+                    # Release this scene's image and buffers before the next one is decoded
+                    del scene
+                encoder.stdin.close()
+            except BrokenPipeError:
+                pass
+            except BaseException:
+                encoder.kill()
+                encoder.wait()
+                raise
+            returncode = encoder.wait()
+            if returncode != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"ffmpeg render exited with {returncode}: {stderr.read().decode(errors='replace').strip()[-2000:]}")
+    logger.info(f"Final video written to {output_video_path}")
@@ -1,23 +1,28 @@
-import requests
-from backend.logging_config import setup_logging
-from dotenv import load_dotenv
+from backend.logging_config import setup_logging, submit_in_context
+from backend.cache import DiskCache, cache_key, write_atomic
+from backend.inference_client import inference_client, InferenceError
 import os
 from pathlib import Path
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Setup logging
 logger = setup_logging(log_file='app.log')
 
-# Load environment variables
-load_dotenv()
+# Text-to-image model endpoint
+API_URL_SD = os.getenv('HF_API_URL_SD', "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0")
 
-# Get the API key for Hugging Face
-HF_API_TOKEN = os.getenv('HF_API_TOKEN')
+# Number of scene prompts sent to the inference API at the same time (1 = serial)
+IMAGE_MAX_IN_FLIGHT = int(os.getenv('IMAGE_MAX_IN_FLIGHT', '4'))
 
-API_URL_SD = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
+# Attempts per scene when the model answers 429 / 503 "model is loading"
+IMAGE_MAX_RETRIES = int(os.getenv('IMAGE_MAX_RETRIES', '5'))
 
-# Headers with authentication
-headers = {"Authorization": f"Bearer {HF_API_TOKEN}"}
+# Content-addressed cache of generated images, shared across runs
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', str(Path(__file__).resolve().parent.parent / 'output/cache/images'))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+
+image_cache = DiskCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, suffix=".png")
 
 def extract_start_time(timestamp):
     """Extracts the start time in seconds from a timestamp string (e.g., '00:10 - 00:20')."""
@@ -27,40 +32,81 @@ def extract_start_time(timestamp):
         return minutes * 60 + seconds
     return 0  # Default to 0 if parsing fails
 
-def generate_images_from_script(script_json, output_dir):
-    """Generate images for each scene based on the script JSON using Hugging Face API."""
+def build_image_prompt(scene):
+    """Build the text-to-image prompt for a single scene."""
+    return (
+        f"A cinematic scene depicting {scene.get('scene_description', '')}. "
+        f"The environment includes {scene.get('character_object_details', '')}. "
+        f"The shot is taken using {scene.get('shot_type_camera_angle', '')} for dramatic effect. "
+        f"The mood of the scene is {scene.get('mood_emotion', '')}. "
+        f"Ultra-detailed, realistic, high-quality, professional lighting, dramatic composition."
+    )
+
+def image_request_key(prompt, api_url=None):
+    """Hash identifying an image request: model URL + request payload."""
+    return cache_key(api_url or API_URL_SD, {"inputs": prompt})
+
+def generate_scene_image(prompt, output_path, scene_no, api_url=None, max_retries=IMAGE_MAX_RETRIES, use_cache=True):
+    """Request one image and write it to output_path. Returns True on success."""
+    api_url = api_url or API_URL_SD
+    payload = {"inputs": prompt}
+
+    # Identical model + prompt + parameters always map to the same cached image
+    key = image_request_key(prompt, api_url)
+    if use_cache and image_cache.fetch(key, output_path):
+        logger.info(f"Image for scene {scene_no} served from cache as {output_path}")
+        return True
+
+    try:
+        content = inference_client.post(api_url, payload, max_retries=max_retries, label=f"Image for scene {scene_no}")
+    except InferenceError as e:
+        logger.error(f"Error generating image for scene {scene_no}: {e.detail}")
+        return False
+
+    # Replace rather than overwrite: the old file may be a hard link to a cache entry
+    write_atomic(output_path, content)
+    if use_cache:
+        image_cache.put_bytes(key, content)
+    logger.info(f"Image saved as {output_path}")
+    return True
+
+def generate_images_from_script(script_json, output_dir, max_in_flight=IMAGE_MAX_IN_FLIGHT, api_url=None, use_cache=True, scenes=None):
+    """Generate images for each scene based on the script JSON using Hugging Face API.
+
+    Up to `max_in_flight` scenes are requested concurrently; each scene_{i}.png is
+    written as soon as its response arrives. Prompts seen before are served
+    from the on-disk image cache without calling the API. `scenes` limits the
+    work to those 1-based scene numbers. Returns the scene numbers that failed.
+    """
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Loop through each scene and generate an image
+
+    jobs = []
     for i, scene in enumerate(script_json.get("scenes", [])):
-        timestamp = scene.get("timestamp", "00:00") 
-        start_time = extract_start_time(timestamp)  # Convert timestamp to seconds
-        
-        prompt = (
-            f"A cinematic scene depicting {scene.get('scene_description', '')}. "
-            f"The environment includes {scene.get('character_object_details', '')}. "
-            f"The shot is taken using {scene.get('shot_type_camera_angle', '')} for dramatic effect. "
-            f"The mood of the scene is {scene.get('mood_emotion', '')}. "
-            f"Ultra-detailed, realistic, high-quality, professional lighting, dramatic composition."
-        )
-
-        # output_path = f"{output_dir}/scene_{start_time}.png"  # Save with start_time in seconds
-        output_path = f"{output_dir}/scene_{i+1}.png"  # Save with start_time in seconds
-        
-        # Prepare the request payload
-        payload = {"inputs": prompt}
-
-        try:
-            response = requests.post(API_URL_SD, headers=headers, json=payload, timeout=60)  # Added timeout
-            
-            # Check if the response is successful
-            if response.status_code == 200:
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
-                logger.info(f"Image saved as {output_path}")
-            else:
-                logger.error(f"Error generating image for scene {i+1}: {response.json()}")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed for scene {i+1}: {str(e)}")
-    
-    logger.info("All images generated successfully.")
+        if scenes is not None and i + 1 not in scenes:
+            continue
+        prompt = build_image_prompt(scene)
+        output_path = f"{output_dir}/scene_{i+1}.png"
+        jobs.append((prompt, output_path, i + 1))
+
+    if not jobs:
+        if scenes is None:
+            logger.warning("No scenes found in script, no images generated.")
+        return []
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+        futures = {
+            submit_in_context(executor, generate_scene_image, prompt, output_path, scene_no, api_url, use_cache=use_cache): scene_no
+            for prompt, output_path, scene_no in jobs
+        }
+        for future in as_completed(futures):
+            if not future.result():
+                failed.append(futures[future])
+
+    if failed:
+        logger.error(f"Image generation failed for scenes: {sorted(failed)}")
+    else:
+        logger.info("All images generated successfully.")
+    logger.info(f"Image cache stats: {image_cache.stats()}")
+    return sorted(failed)
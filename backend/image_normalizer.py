@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from backend.logging_config import setup_logging, submit_in_context
+
+logger = setup_logging(log_file='app.log')
+
+
+# Normalized images are stored this much larger than the video frame, so the
+# deepest Ken Burns zoom (see choose_ken_burns) samples real pixels instead of upscaling
+KEN_BURNS_HEADROOM = 1.2
+
+# Images normalized at the same time; OpenCV and file writes release the GIL
+NORMALIZE_WORKERS = int(os.getenv('NORMALIZE_WORKERS', str(os.cpu_count() or 1)))
+
+
+def parse_size(value):
+    """Parse "720x1280" into (720, 1280); an empty value means the images' own size (None)."""
+    if not value:
+        return None
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+def headroom_size(size, headroom=KEN_BURNS_HEADROOM):
+    """Pixel size a frame of `size` is stored at to leave room for Ken Burns motion."""
+    return round(size[0] * headroom), round(size[1] * headroom)
+
+
+def normalized_path(image_path, size):
+    """Where the normalized array of `image_path` for a `size` video lives: next to the PNG."""
+    image_path = Path(image_path)
+    return image_path.with_name(f"{image_path.stem}.{size[0]}x{size[1]}.npy")
+
+
+def fit_image(pixels, size):
+    """Cover-fit an RGB array to `size`: centre-crop to its aspect ratio, then resize.
+
+    Same framing as the ffmpeg renderer's scale (force_original_aspect_ratio=increase)
+    + crop. Cropping first means only the pixels that end up on screen are resampled.
+    """
+    import cv2
+
+    width, height = size
+    src_h, src_w = pixels.shape[:2]
+    if (src_w, src_h) == (width, height):
+        return pixels
+    if src_w * height > src_h * width:
+        crop_w = round(src_h * width / height)
+        x = (src_w - crop_w) // 2
+        pixels = pixels[:, x:x + crop_w]
+    else:
+        crop_h = round(src_w * height / width)
+        y = (src_h - crop_h) // 2
+        pixels = pixels[y:y + crop_h]
+    interpolation = cv2.INTER_AREA if pixels.shape[1] > width else cv2.INTER_CUBIC
+    return cv2.resize(pixels, (width, height), interpolation=interpolation)
+
+
+def load_frames(path):
+    """Memory-map a normalized image; pages are read on demand and never copied."""
+    import numpy as np
+    return np.load(path, mmap_mode="r")
+
+
+def normalize_image(image_path, size, output_path=None, headroom=KEN_BURNS_HEADROOM):
+    """Decode `image_path` once, fit it to `size` plus headroom and save it as .npy.
+
+    The array is RGB uint8 in C order, written to a temp file and renamed into
+    place so a renderer never maps a half-written file. Returns the output path.
+    """
+    import numpy as np
+    from backend.ken_burns import load_rgb
+
+    output_path = Path(output_path or normalized_path(image_path, size))
+    pixels = np.ascontiguousarray(fit_image(load_rgb(image_path), headroom_size(size, headroom)))
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, pixels)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def normalize_images(jobs, size, workers=NORMALIZE_WORKERS, headroom=KEN_BURNS_HEADROOM):
+    """Normalize a batch of (scene_no, image_path, output_path) jobs on a thread pool.
+
+    Returns {scene_no: output_path} for the images that were normalized; the
+    renderers fall back to the PNG of any scene that failed.
+    """
+    def run(job):
+        scene_no, image_path, output_path = job
+        try:
+            return scene_no, normalize_image(image_path, size, output_path, headroom)
+        except Exception as e:
+            logger.error(f"Unable to normalize image for scene {scene_no}: {e}")
+            return scene_no, None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="normalize") as executor:
+        results = dict(future.result() for future in [submit_in_context(executor, run, job) for job in jobs])
+    done = {scene_no: path for scene_no, path in results.items() if path is not None}
+    logger.info(f"Normalized {len(done)}/{len(jobs)} images to {size[0]}x{size[1]} (+{headroom - 1:.0%} headroom)")
+    return done
@@ -0,0 +1,223 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from backend.logging_config import setup_logging
+
+logger = setup_logging(log_file='app.log')
+
+
+# Get the API key for Hugging Face
+HF_API_TOKEN = os.getenv('HF_API_TOKEN')
+
+# Keep-alive connections kept open per host
+INFERENCE_POOL_SIZE = int(os.getenv('INFERENCE_POOL_SIZE', '16'))
+
+# Requests in flight to one endpoint across every job and worker
+INFERENCE_MAX_CONCURRENCY = int(os.getenv('INFERENCE_MAX_CONCURRENCY', '8'))
+
+# Seconds to establish a connection / to wait for the response
+INFERENCE_CONNECT_TIMEOUT = float(os.getenv('INFERENCE_CONNECT_TIMEOUT', '10'))
+INFERENCE_READ_TIMEOUT = float(os.getenv('INFERENCE_READ_TIMEOUT', '120'))
+
+# Attempts per call for 429 / 503 / transient network errors, and their backoff
+INFERENCE_MAX_RETRIES = int(os.getenv('INFERENCE_MAX_RETRIES', '5'))
+INFERENCE_BACKOFF_BASE = float(os.getenv('INFERENCE_BACKOFF_BASE', '1.0'))
+INFERENCE_BACKOFF_CAP = float(os.getenv('INFERENCE_BACKOFF_CAP', '30.0'))
+
+# Statuses that mean "try again later" rather than "this request is wrong"
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Latency samples kept per endpoint for percentiles
+LATENCY_WINDOW = 1000
+
+
+class InferenceError(Exception):
+    """Raised when an inference call fails for good; `status` is None for network errors."""
+
+    def __init__(self, url, status, detail):
+        super().__init__(f"Inference call to {url} failed ({status}): {detail}")
+        self.url = url
+        self.status = status
+        self.detail = detail
+
+
+def _error_detail(response):
+    try:
+        return response.json()
+    except ValueError:
+        return response.text[:200]
+
+
+class EndpointStats:
+    """Call counts and latencies for one endpoint."""
+
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.statuses = {}
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def to_dict(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(q):
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) if latencies else None
+
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "statuses": dict(sorted(self.statuses.items())),
+            "latency_mean_s": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "latency_p50_s": percentile(0.5),
+            "latency_p95_s": percentile(0.95),
+            "latency_max_s": round(latencies[-1], 3) if latencies else None,
+        }
+
+
+class InferenceClient:
+    """Shared HTTP client for model inference endpoints.
+
+    One pooled keep-alive session serves every caller, so scenes reuse
+    connections instead of paying a TCP/TLS handshake each. Each endpoint has
+    its own concurrency limit, every attempt has connect/read timeouts, and
+    429/503/5xx answers are retried with backoff that honours Retry-After and
+    the inference API's "estimated_time" hint. Per-endpoint latency and status
+    counts are available from `stats()`. The session (and `requests`) is
+    created on the first call, not at import.
+    """
+
+    def __init__(self, token=HF_API_TOKEN, pool_size=INFERENCE_POOL_SIZE, max_concurrency=INFERENCE_MAX_CONCURRENCY,
+                 timeout=(INFERENCE_CONNECT_TIMEOUT, INFERENCE_READ_TIMEOUT), max_retries=INFERENCE_MAX_RETRIES,
+                 backoff_base=INFERENCE_BACKOFF_BASE, backoff_cap=INFERENCE_BACKOFF_CAP):
+        self.token = token
+        self.pool_size = pool_size
+        self._session = None
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._lock = threading.Lock()
+        self._limits = {}  # url -> BoundedSemaphore
+        self._stats = {}  # url -> EndpointStats
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                if self.token:
+                    session.headers["Authorization"] = f"Bearer {self.token}"
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def set_limit(self, url, max_concurrency):
+        """Override the number of concurrent requests allowed to `url`."""
+        with self._lock:
+            self._limits[url] = threading.BoundedSemaphore(max(1, max_concurrency))
+
+    def _endpoint(self, url):
+        with self._lock:
+            if url not in self._limits:
+                self._limits[url] = threading.BoundedSemaphore(self.max_concurrency)
+            if url not in self._stats:
+                self._stats[url] = EndpointStats()
+            return self._limits[url], self._stats[url]
+
+    def _retry_delay(self, response, attempt):
+        """Server hint (Retry-After / estimated_time) if there is one, else jittered exponential backoff."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if response is None:
+            return delay
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_cap)
+            except ValueError:
+                pass
+        try:
+            estimated = response.json().get("estimated_time")
+            if estimated:
+                return min(float(estimated), self.backoff_cap)
+        except (ValueError, AttributeError):
+            pass
+        return delay
+
+    def post(self, url, payload, timeout=None, max_retries=None, label=None):
+        """POST `payload` as JSON and return the response body bytes, retrying transient failures.
+
+        Raises InferenceError once retries are exhausted or on a non-retryable status.
+        """
+        from requests.exceptions import RequestException
+
+        limit, stats = self._endpoint(url)
+        session = self.session
+        timeout = timeout if timeout is not None else self.timeout
+        max_retries = max_retries if max_retries is not None else self.max_retries
+        label = label or url
+        with self._lock:
+            stats.calls += 1
+
+        for attempt in range(max_retries):
+            response, error = None, None
+            with limit:
+                with self._lock:
+                    stats.attempts += 1
+                    stats.in_flight += 1
+                start = time.perf_counter()
+                try:
+                    response = session.post(url, json=payload, timeout=timeout)
+                    # Read the whole body inside the slot so the connection goes back to the pool
+                    content = response.content
+                except RequestException as e:
+                    response, error = None, e
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    stats.in_flight -= 1
+                    stats.latencies.append(elapsed)
+                    status = str(response.status_code) if response is not None else "error"
+                    stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+            if response is not None and response.status_code == 200:
+                return content
+
+            retryable = error is not None or response.status_code in RETRY_STATUSES
+            if not retryable or attempt == max_retries - 1:
+                with self._lock:
+                    stats.failures += 1
+                if error is not None:
+                    raise InferenceError(url, None, str(error)) from error
+                raise InferenceError(url, response.status_code, _error_detail(response))
+
+            delay = self._retry_delay(response, attempt)
+            reason = str(error) if error is not None else f"HTTP {response.status_code}"
+            logger.warning(f"{label}: {reason}, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            with self._lock:
+                stats.retries += 1
+            time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {url: stats.to_dict() for url, stats in self._stats.items()}
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+# Shared by every model call in the process
+inference_client = InferenceClient()
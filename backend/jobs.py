@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from backend.logging_config import setup_logging
+
+logger = setup_logging(log_file='app.log')
+
+
+# Jobs executing at the same time
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+
+# Jobs allowed to wait for a free worker before new submissions are rejected
+JOB_QUEUE_DEPTH = int(os.getenv('JOB_QUEUE_DEPTH', '8'))
+
+# Finished jobs remembered for status lookups
+JOB_HISTORY = int(os.getenv('JOB_HISTORY', '200'))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while every worker and queue slot is taken."""
+
+
+class Job:
+    """State of one submitted unit of work, updated by the worker running it."""
+
+    def __init__(self, job_id, description=None):
+        self.id = job_id
+        self.description = description
+        self.status = QUEUED
+        self.stage = None
+        self.progress = 0.0
+        self.result = None
+        self.output = None  # file the job is writing, readable while it runs
+        self.error = None
+        self.timings = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    def update(self, stage=None, progress=None):
+        """Report progress from inside the running job."""
+        if stage is not None:
+            self.stage = stage
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "description": self.description,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "error": self.error,
+            "timings": {stage: round(seconds, 3) for stage, seconds in self.timings.items()},
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """Bounded thread pool for blocking jobs with admission control.
+
+    At most `max_workers` jobs run at once and at most `max_queued` more wait
+    for a worker; anything beyond that is rejected with QueueFull instead of
+    piling up behind the pool.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_queued=JOB_QUEUE_DEPTH, history=JOB_HISTORY):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, func, *args, description=None, block=False, **kwargs):
+        """Queue func(job, *args, **kwargs); returns the Job or raises QueueFull.
+
+        With `block` the caller waits for a free slot instead of being rejected.
+        """
+        if not self._slots.acquire(blocking=block):
+            raise QueueFull(f"Job queue is full ({self.max_workers} running, {self.max_queued} queued).")
+
+        job = Job(uuid.uuid4().hex, description)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job, func, args, kwargs)
+        logger.info(f"Job {job.id} queued: {description}")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {"workers": self.max_workers, "queue_depth": self.max_queued, **counts}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, func, args, kwargs):
+        job.status = RUNNING
+        job.started_at = time.time()
+        logger.info(f"Job {job.id} started")
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = DONE
+            job.progress = 1.0
+            logger.info(f"Job {job.id} finished in {time.time() - job.started_at:.2f}s")
+            return job.result
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            logger.error(f"Job {job.id} failed: {e}")
+            raise
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+
+    def _prune(self):
+        """Forget the oldest finished jobs once the history limit is exceeded."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (DONE, FAILED)]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
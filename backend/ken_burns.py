@@ -0,0 +1,158 @@
+import cv2
+import numpy as np
+from moviepy.video.VideoClip import VideoClip
+
+# Pans move a window across the image scaled up by this factor (10% headroom)
+PAN_ZOOM = 1 / 0.9
+
+# Extra zoom per second, centred on the frame, added by the "zoom out" transition
+TRANSITION_ZOOM_RATE = 0.05
+
+
+def transition_zoom_rate(transition):
+    """Zoom per second a scene transition adds on top of its Ken Burns motion."""
+    return TRANSITION_ZOOM_RATE if transition == "zoom out" else 0.0
+
+
+def load_rgb(image):
+    """Decode an image path to an RGB uint8 array (arrays are passed through, .npy files memory-mapped)."""
+    if isinstance(image, np.ndarray):
+        return image
+    if str(image).endswith(".npy"):
+        return np.load(image, mmap_mode="r")
+    pixels = cv2.imread(str(image), cv2.IMREAD_COLOR)
+    if pixels is None:
+        raise ValueError(f"Unable to read image {image}")
+    return cv2.cvtColor(pixels, cv2.COLOR_BGR2RGB)
+
+
+def ken_burns_trajectory(motion, size, n_frames, duration, fps):
+    """Per-frame 2x3 affine matrices (source -> output) for a Ken Burns motion.
+
+    Frame i is sampled at t = i / fps with progress t / duration, the same
+    timing the MoviePy resize/crop lambdas use.
+    """
+    w, h = size
+    progress = np.minimum(np.arange(n_frames) / fps / duration, 1.0)
+    effect, zoom = motion["effect"], motion["zoom"]
+
+    # Visible window centre in scaled-image coordinates, before dividing by the zoom
+    center_x = np.full(n_frames, w / 2)
+    center_y = np.full(n_frames, h / 2)
+    if effect == "in":
+        scale = 1 + (zoom - 1) * progress
+    elif effect == "out":
+        scale = zoom - (zoom - 1) * progress
+    elif effect in ("left", "right", "up", "down"):
+        scale = np.full(n_frames, PAN_ZOOM)
+        travel = progress if effect in ("left", "up") else 1 - progress
+        if effect in ("left", "right"):
+            center_x = travel * (w * PAN_ZOOM - w) + w / 2
+            center_y = np.full(n_frames, h * PAN_ZOOM / 2)
+        else:
+            center_x = np.full(n_frames, w * PAN_ZOOM / 2)
+            center_y = travel * (h * PAN_ZOOM - h) + h / 2
+    else:
+        scale = np.ones(n_frames)
+
+    if effect in ("in", "out"):
+        # Zooms stay centred on the image centre
+        center_x = w * scale / 2
+        center_y = h * scale / 2
+
+    matrices = np.zeros((n_frames, 2, 3), dtype=np.float64)
+    matrices[:, 0, 0] = scale
+    matrices[:, 1, 1] = scale
+    matrices[:, 0, 2] = w / 2 - center_x
+    matrices[:, 1, 2] = h / 2 - center_y
+    return matrices
+
+
+class KenBurnsFrames:
+    """Frames of a still image with a Ken Burns zoom/pan, driven by a precomputed trajectory.
+
+    The image is decoded once and the whole zoom/pan trajectory is computed up
+    front. Zoom frames are produced with a single warpAffine into reused
+    output buffers; pans have a constant scale, so the image is scaled once and
+    each frame is a zero-copy window into it. Frames are fully determined by
+    `motion`, which makes them reproducible. Holds no reference cycles, so a
+    scene's buffers are freed as soon as it is dropped.
+
+    `image` may be larger than `size` with the same aspect ratio, e.g. a
+    normalized .npy with Ken Burns headroom; zooms then sample it directly.
+    Images of another aspect ratio are cover-fitted to `size` first.
+    `zoom_rate` adds a zoom of 1 + zoom_rate * t centred on the frame, as the
+    "zoom out" transition does.
+    """
+
+    def __init__(self, image, duration, motion, fps=24, size=None, zoom_rate=0.0):
+        from backend.image_normalizer import fit_image
+
+        self.image = load_rgb(image)
+        src_h, src_w = self.image.shape[:2]
+        w, h = size or (src_w, src_h)
+        if src_w < w or src_h < h or abs(src_w / src_h - w / h) > 0.01:
+            self.image = fit_image(self.image, (w, h))
+            src_h, src_w = h, w
+
+        self.output_size = (w, h)
+        self.fps = fps
+        self.n_frames = max(1, int(np.ceil(duration * fps)) + 1)
+        self.matrices = ken_burns_trajectory(motion, (w, h), self.n_frames, duration, fps)
+        if zoom_rate:
+            # Scale every output frame about its centre: out' = e * (out - c) + c
+            extra = 1 + zoom_rate * np.arange(self.n_frames) / fps
+            self.matrices *= extra[:, None, None]
+            self.matrices[:, 0, 2] += (1 - extra) * w / 2
+            self.matrices[:, 1, 2] += (1 - extra) * h / 2
+        # The trajectory maps a w x h image; scale it to the stored image's pixels
+        self.matrices[:, :, 0] *= w / src_w
+        self.matrices[:, :, 1] *= h / src_h
+
+        effect = motion["effect"]
+        if effect in ("in", "out") or zoom_rate:
+            # OpenCV's 4-channel warp is vectorised and ~2x faster than 3-channel,
+            # even with the conversion back to RGB
+            self.mode = "warp"
+            self.image_rgba = cv2.cvtColor(self.image, cv2.COLOR_RGB2RGBA)
+            self.warp_buffer = np.empty((h, w, 4), dtype=np.uint8)
+            self.buffer = np.empty((h, w, 3), dtype=np.uint8)
+        elif effect in ("left", "right", "up", "down"):
+            self.mode = "pan"
+            pan_size = (round(w * PAN_ZOOM), round(h * PAN_ZOOM))
+            interpolation = cv2.INTER_AREA if src_w > pan_size[0] else cv2.INTER_LINEAR
+            self.scaled = cv2.resize(self.image, pan_size, interpolation=interpolation)
+            max_x, max_y = self.scaled.shape[1] - w, self.scaled.shape[0] - h
+            self.offsets = np.rint(-self.matrices[:, :, 2]).astype(int)
+            self.offsets[:, 0] = np.clip(self.offsets[:, 0], 0, max_x)
+            self.offsets[:, 1] = np.clip(self.offsets[:, 1], 0, max_y)
+        else:
+            self.mode = "still"
+            if (src_w, src_h) != (w, h):
+                self.image = cv2.resize(self.image, (w, h), interpolation=cv2.INTER_AREA)
+
+    def _index(self, t):
+        return min(int(round(t * self.fps)), self.n_frames - 1)
+
+    def frame(self, t):
+        """RGB frame at time t; zoom frames reuse one buffer, so copy it to keep it."""
+        if self.mode == "warp":
+            cv2.warpAffine(
+                self.image_rgba, self.matrices[self._index(t)], self.output_size, dst=self.warp_buffer,
+                flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE,
+            )
+            cv2.cvtColor(self.warp_buffer, cv2.COLOR_RGBA2RGB, dst=self.buffer)
+            return self.buffer
+        if self.mode == "pan":
+            x, y = self.offsets[self._index(t)]
+            w, h = self.output_size
+            return self.scaled[y:y + h, x:x + w]
+        return self.image
+
+
+class KenBurnsClip(VideoClip):
+    """MoviePy clip of KenBurnsFrames, for the MoviePy renderer."""
+
+    def __init__(self, image, duration, motion, fps=24, size=None, zoom_rate=0.0):
+        self.frames = KenBurnsFrames(image, duration, motion, fps=fps, size=size, zoom_rate=zoom_rate)
+        VideoClip.__init__(self, make_frame=self.frames.frame, duration=duration)
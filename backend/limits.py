@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from backend.metrics import Histogram
+
+# Calls allowed in flight per shared resource, across every job and batch in
+# the process. Inference HTTP endpoints (images, music) have their own
+# per-URL limits in InferenceClient.
+RESOURCE_LIMITS = {
+    # Script model streams
+    "script": int(os.getenv('SCRIPT_MAX_CONCURRENCY', '4')),
+    # Text-to-speech calls
+    "tts": int(os.getenv('TTS_MAX_CONCURRENCY', '8')),
+    # Final renders; each ffmpeg encode already uses every core
+    "render": int(os.getenv('RENDER_MAX_CONCURRENCY', '2')),
+}
+
+
+class ResourceLimiter:
+    """Shared queue in front of one resource: at most `limit` holders, the rest wait their turn."""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = max(1, limit)
+        self._semaphore = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.acquired = 0
+        self.waits = Histogram()
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot for the duration of the block, waiting for a free one if needed."""
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        self._semaphore.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+            self.acquired += 1
+            self.waits.observe(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "acquired": self.acquired,
+                "wait_p50_s": self.waits.quantile(0.5),
+                "wait_p95_s": self.waits.quantile(0.95),
+                "wait_max_s": round(self.waits.max, 3) if self.waits.count else None,
+            }
+
+
+class ResourceLimits:
+    """The process-wide limiters, by resource name."""
+
+    def __init__(self, limits=RESOURCE_LIMITS):
+        self._limiters = {name: ResourceLimiter(name, limit) for name, limit in limits.items()}
+
+    def get(self, name):
+        if name not in self._limiters:
+            raise ValueError(f"Unknown resource '{name}'. Available: {', '.join(self._limiters)}")
+        return self._limiters[name]
+
+    def slot(self, name):
+        return self.get(name).slot()
+
+    def stats(self):
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+# Shared by every job, batch and worker thread
+resource_limits = ResourceLimits()
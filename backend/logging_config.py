@@ -1,22 +1,116 @@
 # logging_config.py
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+# Records at or above this level are written
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# "json" writes one JSON object per line, "text" the classic "time - level - message" lines
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+
+# Run and stage the current thread is working on; copied onto every record
+current_run_id = contextvars.ContextVar("run_id", default=None)
+current_stage = contextvars.ContextVar("stage", default=None)
+
+_setup_lock = threading.Lock()
+_listener = None
+
+
+class ContextFilter(logging.Filter):
+    """Stamp the run id and stage of the emitting thread onto the record.
+
+    Runs in the emitting thread, before the record is queued, so the values are
+    those of the code that logged rather than of the listener thread.
+    """
+
+    def filter(self, record):
+        if not hasattr(record, "run_id"):
+            record.run_id = current_run_id.get()
+        if not hasattr(record, "stage"):
+            record.stage = current_stage.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record with run id, stage and duration when they are known."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("run_id", "stage", "duration_s"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
 
 def setup_logging(log_file='app.log'):
     """
-    Setup logging configuration to log to a single file.
+    Setup logging once per process and return the root logger.
+
+    Records are put on an in-memory queue by the calling thread and written to
+    `log_file` by a background QueueListener, so logging never blocks on disk.
+    Later calls (every module calls this at import) reuse that setup.
     """
+    global _listener
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
+    with _setup_lock:
+        if _listener is not None:
+            return logger
 
-    # Create file handler to save logs to a file
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
+        file_handler = logging.FileHandler(log_file)
+        if LOG_FORMAT == "json":
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 
-    # Create a formatter
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        logger.addHandler(queue_handler)
+        logger.setLevel(LOG_LEVEL)
 
-    # Add the file handler to the logger
-    logger.addHandler(file_handler)
-    
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        # Flush whatever is still queued when the process exits
+        atexit.register(_listener.stop)
     return logger
+
+
+@contextmanager
+def log_context(run_id=None, stage=None):
+    """Tag every record logged inside the block (in this thread) with `run_id` / `stage`."""
+    tokens = []
+    if run_id is not None:
+        tokens.append((current_run_id, current_run_id.set(run_id)))
+    if stage is not None:
+        tokens.append((current_stage, current_stage.set(stage)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """executor.submit that runs `fn` in a copy of the caller's context.
+
+    Pool threads don't inherit context variables, so without this the records
+    a task logs lose the run id and stage of the code that queued it.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -1,69 +1,275 @@
-from fastapi import FastAPI, Form
-from fastapi.responses import FileResponse
-from pathlib import Path
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Form, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 import json
-from backend.text_generator import generate_video_script, extract_json, save_json
-from backend.image_generator import generate_images_from_script
-from backend.audio_generator import generate_audio
-from backend.music_generator import generate_music, generate_music_prompt
-from backend.video_generator import create_final_video,apply_ken_burns
+from backend.image_generator import image_cache
+from backend.audio_generator import tts_cache
+from backend.inference_client import inference_client
+from backend.script_cache import script_cache
 from backend.logging_config import setup_logging
+from backend.metrics import stage_metrics
+from backend.limits import resource_limits
+from backend.jobs import JobQueue, QueueFull, DONE, FAILED
+from backend.runs import run_video_pipeline, load_run, workspaces
+from backend.workspaces import RunBusy
+from backend.batches import BatchRunner
 from fastapi.staticfiles import StaticFiles
 
 # Setup logger
 logger = setup_logging(log_file='app.log')
 
-app = FastAPI()
+# Blocking video generation runs here, off the event loop
+job_queue = JobQueue()
+
+# Job building each run submitted here, so a run is never resumed while a job for it is still queued
+_run_jobs = {}
+
+# Multi-topic batches run on their own job queue, sharing endpoint and render limits with job_queue
+batch_runner = BatchRunner()
+
+# Bytes sent per chunk, and how often a growing video is checked for new bytes
+STREAM_CHUNK_BYTES = 256 * 1024
+STREAM_POLL_SECONDS = 0.25
+
+
+@asynccontextmanager
+async def lifespan(app):
+    workspaces.start_reaper()
+    yield
+    workspaces.stop_reaper()
+    job_queue.shutdown(wait=False)
+    batch_runner.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
-# Directories for storing outputs
-current_path = Path(__file__).resolve()
-root_path = current_path.parent.parent
-output_data_dir = root_path / 'output/video'
+def _get_job_or_404(job_id):
+    job = job_queue.get(job_id) or batch_runner.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+
+async def _submit_run(topic, run_id=None, stream=False, use_script_cache=True):
+    """Queue a pipeline run; raises QueueFull when the queue or the scratch quota is
+    exhausted, and RunBusy if `run_id` is already being built or queued."""
+    # Walks (and may reap) the workspace tree, so it runs off the event loop
+    if not await asyncio.to_thread(workspaces.has_room):
+        raise QueueFull("Run workspaces are over their disk quota.")
+    # Checked after the await, with nothing awaited until the job is recorded
+    if run_id is not None and _run_in_progress(run_id):
+        raise RunBusy(f"Run {run_id} is already in progress")
+    job = job_queue.submit(
+        run_video_pipeline, topic, run_id=run_id, stream=stream, use_script_cache=use_script_cache, description=topic
+    )
+    for done_run in [r for r, j in _run_jobs.items() if j.future.done()]:
+        del _run_jobs[done_run]
+    _run_jobs[run_id or job.id] = job
+    return job
+
+
+def _run_in_progress(run_id):
+    """True if a job is building `run_id` or is queued to."""
+    job = _run_jobs.get(run_id)
+    return workspaces.is_active(run_id) or (job is not None and not job.future.done())
+
+
+async def _tail_job_output(job):
+    """Yield the job's output file as it grows, finishing once the job is done.
+
+    The file is opened once, so the stream keeps following it when the run
+    renames the partial render to its final name.
+    """
+    handle = None
+    try:
+        while handle is None:
+            path = job.output
+            if path is not None and os.path.exists(path):
+                try:
+                    handle = open(path, "rb")
+                except FileNotFoundError:
+                    continue  # renamed between the check and the open; re-read job.output
+            elif job.future.done():
+                return
+            else:
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+
+        while True:
+            # Check before reading so bytes written just before completion are not lost
+            finished = job.future.done()
+            chunk = handle.read(STREAM_CHUNK_BYTES)
+            if chunk:
+                yield chunk
+            elif finished:
+                return
+            else:
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+    finally:
+        if handle is not None:
+            handle.close()
+
+
+def _stream_job(job):
+    return StreamingResponse(_tail_job_output(job), media_type="video/mp4", headers={"X-Job-Id": job.id})
 
-# Ensure output directories exist
-output_data_dir.mkdir(parents=True, exist_ok=True)
-images_output_dir = output_data_dir / 'output_images'
-audio_output_dir = output_data_dir / 'output_audio'
-music_output_dir = output_data_dir / 'output_music'
 
 @app.post("/generate_video/")
-async def generate_video(topic: str = Form(...)):
+async def generate_video(topic: str = Form(...), stream: bool = Form(False), use_script_cache: bool = Form(True)):
+    try:
+        job = await _submit_run(topic, stream=stream, use_script_cache=use_script_cache)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if stream:
+        # Start sending the fragmented MP4 as soon as its first fragment is rendered
+        return _stream_job(job)
+
     try:
-        # Generate the video script
-        response_text = generate_video_script(topic)
-        video_script = extract_json(response_text)
-        
-        # # Save the generated script to a JSON file
-        save_json(video_script, output_data_dir)
-
-        # Read the saved video script
-        json_file = output_data_dir / "video_script.json"
-        with json_file.open("r", encoding="utf-8") as file:
-            script = json.load(file)
-        
-        # Generate images from the script
-        generate_images_from_script(script, images_output_dir)
-
-        # Generate audio from the script
-        generate_audio(script, audio_output_dir)
-
-        # Generate background music based on the script
-        music_prompt = generate_music_prompt(script["background_music_prompt"], script["scenes"], script["overall_video_mood"])
-        generate_music(music_prompt, music_output_dir)
-
-        # Create the final video using the generated script, images, audio, and music
-        final_video_path = output_data_dir / "final_video.mp4"
-        create_final_video(script, str(images_output_dir), str(audio_output_dir), str(music_output_dir/"background_music.flac"), str(final_video_path))
+        # Wait for the worker without blocking the event loop
+        final_video_path = await asyncio.wrap_future(job.future)
 
         # Return the generated video file as a response
-        return FileResponse(final_video_path, media_type="video/mp4")
+        timings = {stage: round(seconds, 3) for stage, seconds in job.timings.items()}
+        return FileResponse(final_video_path, media_type="video/mp4", headers={"X-Stage-Timings": json.dumps(timings)})
 
     except Exception as e:
         logger.error(f"Error generating video: {e}")
         return {"error": str(e)}
 
+
+@app.post("/jobs/", status_code=202)
+async def submit_job(topic: str = Form(...), stream: bool = Form(False), use_script_cache: bool = Form(True)):
+    """Queue a video generation job and return its id immediately.
+
+    With `stream` the video is rendered as fragmented MP4 and can be watched
+    from /jobs/{job_id}/stream while it is being encoded. `use_script_cache`
+    set to false always asks the model for a fresh script.
+    """
+    try:
+        job = await _submit_run(topic, stream=stream, use_script_cache=use_script_cache)
+    except QueueFull as e:
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "30"})
+    return {"job_id": job.id, "run_id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return _get_job_or_404(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/video")
+async def job_video(job_id: str):
+    job = _get_job_or_404(job_id)
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+    # FileResponse answers Range requests with 206, so finished videos are seekable
+    return FileResponse(job.result, media_type="video/mp4")
+
+
+@app.get("/jobs/{job_id}/stream")
+async def job_stream(job_id: str):
+    """Serve the job's video while it renders; waits for the render to start if needed."""
+    job = _get_job_or_404(job_id)
+    if job.status == FAILED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} failed: {job.error}")
+    return _stream_job(job)
+
+
+async def _batch_results(batch):
+    """NDJSON: the batch id, then one line per video as it finishes, then the batch summary."""
+    yield json.dumps({"batch_id": batch.id, "topics": batch.topics}, ensure_ascii=False) + "\n"
+    seen = 0
+    while seen < len(batch.topics):
+        results = batch.results[seen:]
+        for result in results:
+            yield json.dumps(dict(result, videos_per_hour=batch.videos_per_hour()), ensure_ascii=False) + "\n"
+        seen += len(results)
+        if not results:
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+    yield json.dumps(batch.summary()) + "\n"
+
+
+@app.post("/batches/")
+async def submit_batch(topics: list[str] = Form(...), use_script_cache: bool = Form(True)):
+    """Generate one video per topic and stream each result as soon as its video is done.
+
+    `topics` may be repeated or hold one topic per line. The response is
+    newline-delimited JSON ending with a summary that reports throughput in
+    videos per hour; finished videos are served from /jobs/{job_id}/video.
+    The batch keeps running if the client disconnects; see /batches/{batch_id}.
+    """
+    try:
+        batch = batch_runner.submit(topics, use_script_cache=use_script_cache)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(_batch_results(batch), media_type="application/x-ndjson", headers={"X-Batch-Id": batch.id})
+
+
+@app.get("/batches/{batch_id}")
+async def batch_status(batch_id: str):
+    batch = batch_runner.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch {batch_id}")
+    return batch.to_dict()
+
+
+@app.get("/runs/{run_id}")
+async def run_manifest(run_id: str):
+    """Artifacts recorded for a run, with the inputs hash each was built from."""
+    manifest = load_run(run_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run {run_id}")
+    return manifest.data
+
+
+@app.post("/runs/{run_id}/resume", status_code=202)
+async def resume_run(run_id: str, stream: bool = Form(False)):
+    """Re-run a previous run, rebuilding only missing or stale artifacts."""
+    manifest = load_run(run_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run {run_id}")
+    topic = manifest.meta.get("topic")
+    try:
+        job = await _submit_run(topic, run_id=run_id, stream=stream)
+    except RunBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFull as e:
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "30"})
+    return {"job_id": job.id, "run_id": run_id, "status": job.status}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"images": image_cache.stats(), "tts": tts_cache.stats(), "scripts": script_cache.stats()}
+
+
+@app.get("/inference/stats")
+async def inference_stats():
+    """Per-endpoint call counts, retries, statuses and latency percentiles."""
+    return inference_client.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Latency histograms of every pipeline stage (script, images, voiceover, music, render)."""
+    return stage_metrics.stats()
+
+
+@app.get("/limits/stats")
+async def limits_stats():
+    """Slots in use and callers waiting for the script model, TTS and renders, across all jobs."""
+    return resource_limits.stats()
+
+
+@app.get("/workspaces/stats")
+async def workspace_stats():
+    return workspaces.usage()
+
+
 @app.get("/")
 async def root():
     return FileResponse("static/index.html")
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from backend.logging_config import setup_logging
+
+logger = setup_logging(log_file='app.log')
+
+MANIFEST_FILE = "manifest.json"
+
+
+class RunManifest:
+    """Record of every artifact a run produced, stored as <run_dir>/manifest.json.
+
+    Each artifact is keyed by a name such as "script", "image:3" or
+    "voiceover:3" and stores the hash of the inputs it was built from plus its
+    path relative to the run directory. An artifact is fresh when its file
+    still exists and was built from the same inputs; anything else is rebuilt,
+    the same way make compares targets against their prerequisites.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = Path(run_dir)
+        self.path = self.run_dir / MANIFEST_FILE
+        self._lock = threading.Lock()
+        self.data = {"meta": {}, "artifacts": {}}
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    @property
+    def meta(self):
+        return self.data["meta"]
+
+    def set_meta(self, **values):
+        with self._lock:
+            self.data["meta"].update(values)
+            self._save()
+
+    def is_fresh(self, name, inputs_hash):
+        """True if `name` exists on disk and was built from `inputs_hash`."""
+        with self._lock:
+            entry = self.data["artifacts"].get(name)
+        return bool(entry) and entry["inputs"] == inputs_hash and (self.run_dir / entry["path"]).exists()
+
+    def inputs_hash(self, name):
+        with self._lock:
+            entry = self.data["artifacts"].get(name)
+        return entry["inputs"] if entry else None
+
+    def record(self, name, inputs_hash, path):
+        """Mark `name` as built from `inputs_hash` at `path` (absolute or run-relative)."""
+        path = Path(path)
+        if path.is_absolute():
+            path = path.relative_to(self.run_dir)
+        with self._lock:
+            self.data["artifacts"][name] = {"inputs": inputs_hash, "path": str(path), "built_at": time.time()}
+            self._save()
+
+    def artifacts(self):
+        """Snapshot of every recorded artifact: name -> {"inputs", "path", "built_at"}."""
+        with self._lock:
+            return dict(self.data["artifacts"])
+
+    def artifact_path(self, name):
+        with self._lock:
+            entry = self.data["artifacts"].get(name)
+        return self.run_dir / entry["path"] if entry else None
+
+    def _save(self):
+        # Write to a temp file and swap it in so a crash never leaves a torn manifest
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.run_dir, prefix=".manifest-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,180 @@
+"""Cheap media metadata readers that avoid decoding through ffmpeg."""
+
+# Bitrates in kbps, indexed by [version is MPEG-1][layer][bitrate index]
+_BITRATES = {
+    True: {
+        1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+        3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    },
+    False: {
+        1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+
+# Sample rates indexed by the 2-bit version field (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+_LAYERS = {1: 3, 2: 2, 3: 1}  # 2-bit layer field -> layer number
+
+
+def _parse_frame_header(data, pos):
+    """Return (frame_length, samples, sample_rate) for an MPEG audio header at pos, or None."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x03
+    layer = _LAYERS.get((data[pos + 1] >> 1) & 0x03)
+    bitrate_index = (data[pos + 2] >> 4) & 0x0F
+    rate_index = (data[pos + 2] >> 2) & 0x03
+    padding = (data[pos + 2] >> 1) & 0x01
+    if version == 1 or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 2 or mpeg1:
+        return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+    return 72 * bitrate // sample_rate + padding, 576, sample_rate
+
+
+def _skip_id3v2(data):
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def mp3_duration(data):
+    """Duration in seconds of MP3 bytes, computed by walking frame headers."""
+    pos = _skip_id3v2(data)
+    seconds = 0.0
+    first = True
+    while pos < len(data) - 4:
+        header = _parse_frame_header(data, pos)
+        if header is None or header[0] <= 0:
+            # Junk or a trailing tag; resync on the next byte
+            pos += 1
+            continue
+        frame_length, samples, sample_rate = header
+        # A leading Xing/Info/VBRI frame carries metadata, not audio
+        frame = data[pos:pos + min(frame_length, 64)]
+        if not (first and any(tag in frame for tag in (b"Xing", b"Info", b"VBRI"))):
+            seconds += samples / sample_rate
+        first = False
+        pos += frame_length
+    return seconds
+
+
+def mp3_file_duration(path):
+    """Duration in seconds of an MP3 file without decoding it."""
+    with open(path, "rb") as f:
+        return mp3_duration(f.read())
+
+
+def image_size(path):
+    """(width, height) of a PNG or JPEG file read from its header, or None if unknown."""
+    with open(path, "rb") as f:
+        head = f.read(26)
+        if head[:8] == b"\x89PNG\r\n\x1a\n":
+            return int.from_bytes(head[16:20], "big"), int.from_bytes(head[20:24], "big")
+        if head[:2] != b"\xff\xd8":
+            return None
+
+        # JPEG: walk the segments until a start-of-frame marker
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length = int.from_bytes(f.read(2), "big")
+            if marker[1] in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+                data = f.read(5)
+                return int.from_bytes(data[3:5], "big"), int.from_bytes(data[1:3], "big")
+            f.seek(length - 2, 1)
+
+
+def sniff_audio_format(data):
+    """Container of an audio payload from its magic bytes: "flac", "wav", "ogg", "mp3" or None."""
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:3] == b"ID3" or _parse_frame_header(data, 0) is not None:
+        return "mp3"
+    return None
+
+
+def flac_duration(data):
+    """Duration in seconds from the FLAC STREAMINFO block, or None if it does not say."""
+    # STREAMINFO is always the first metadata block, right after "fLaC" and its 4-byte header
+    info = data[8:8 + 34]
+    if len(info) < 18:
+        return None
+    sample_rate = int.from_bytes(info[10:13], "big") >> 4
+    total_samples = int.from_bytes(info[13:18], "big") & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    return total_samples / sample_rate
+
+
+def wav_duration(data):
+    """Duration in seconds of a PCM WAV payload from its fmt and data chunks."""
+    pos = 12
+    byte_rate = None
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = int.from_bytes(data[pos + 4:pos + 8], "little")
+        if chunk_id == b"fmt ":
+            byte_rate = int.from_bytes(data[pos + 16:pos + 20], "little")
+        elif chunk_id == b"data" and byte_rate:
+            # Streamed WAVs may leave the size unset; fall back to what is there
+            size = min(size, len(data) - pos - 8) if size else len(data) - pos - 8
+            return size / byte_rate
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def ogg_duration(data):
+    """Duration in seconds of an Ogg Vorbis/Opus payload from its last granule position."""
+    last = data.rfind(b"OggS")
+    if last == -1 or last + 14 > len(data):
+        return None
+    granule = int.from_bytes(data[last + 6:last + 14], "little")
+    opus = data.find(b"OpusHead")
+    if opus != -1:
+        pre_skip = int.from_bytes(data[opus + 10:opus + 12], "little")
+        return max(0, granule - pre_skip) / 48000
+    vorbis = data.find(b"\x01vorbis")
+    if vorbis == -1:
+        return None
+    sample_rate = int.from_bytes(data[vorbis + 12:vorbis + 16], "little")
+    return granule / sample_rate if sample_rate else None
+
+
+def audio_duration(data, audio_format=None):
+    """Duration in seconds of an audio payload without decoding it, or None if unknown."""
+    audio_format = audio_format or sniff_audio_format(data)
+    if audio_format == "mp3":
+        return mp3_duration(data)
+    if audio_format == "flac":
+        return flac_duration(data)
+    if audio_format == "wav":
+        return wav_duration(data)
+    if audio_format == "ogg":
+        return ogg_duration(data)
+    return None
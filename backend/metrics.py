@@ -0,0 +1,108 @@
+import bisect
+import threading
+import time
+from contextlib import ContextDecorator
+from backend.logging_config import setup_logging, log_context
+
+logger = setup_logging(log_file='app.log')
+
+# Upper bounds (seconds) of the latency histogram buckets; slower samples land in "+Inf"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, cheap enough to update on every call."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th sample (the max for the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def to_dict(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 3),
+            "mean_s": round(self.sum / self.count, 3) if self.count else None,
+            "p50_s": self.quantile(0.5),
+            "p95_s": self.quantile(0.95),
+            "max_s": round(self.max, 3) if self.count else None,
+            "buckets": buckets,
+        }
+
+
+class StageMetrics:
+    """Latency histograms keyed by stage name, shared by every run in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._errors = {}
+
+    def observe(self, stage, seconds, failed=False):
+        with self._lock:
+            if stage not in self._histograms:
+                self._histograms[stage] = Histogram()
+            self._histograms[stage].observe(seconds)
+            if failed:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                stage: dict(histogram.to_dict(), errors=self._errors.get(stage, 0))
+                for stage, histogram in sorted(self._histograms.items())
+            }
+
+
+stage_metrics = StageMetrics()
+
+
+class timed(ContextDecorator):
+    """Time a block or function as `stage`: records it in stage_metrics and logs its duration.
+
+    Records logged inside the block carry the stage name.
+    """
+
+    def __init__(self, stage, metrics=None):
+        self.stage = stage
+        self.metrics = metrics or stage_metrics
+        self._local = threading.local()
+
+    def __enter__(self):
+        context = log_context(stage=self.stage)
+        context.__enter__()
+        self._local.state = (context, time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        context, start = self._local.state
+        elapsed = time.perf_counter() - start
+        self.metrics.observe(self.stage, elapsed, failed=exc_type is not None)
+        outcome = "failed" if exc_type is not None else "finished"
+        logger.info(f"Stage '{self.stage}' {outcome} in {elapsed:.2f}s", extra={"duration_s": round(elapsed, 3)})
+        context.__exit__(exc_type, exc, tb)
+        return False
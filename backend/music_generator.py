@@ -1,20 +1,20 @@
 import os
-import subprocess
-import requests
-from moviepy.editor import AudioFileClip
+import json
 from backend.logging_config import setup_logging
-from dotenv import load_dotenv
+from backend.inference_client import inference_client, InferenceError, INFERENCE_CONNECT_TIMEOUT
+from backend.media_info import sniff_audio_format, audio_duration
 from pathlib import Path
 
 logger = setup_logging(log_file='app.log')
 
-load_dotenv()
 
-HF_API_TOKEN = os.getenv('HF_API_TOKEN')
+API_URL_MUSICGEN = os.getenv('HF_API_URL_MUSICGEN', "https://api-inference.huggingface.co/models/facebook/musicgen-small")
 
-API_URL_MUSICGEN = "https://api-inference.huggingface.co/models/facebook/musicgen-small"
+# Seconds to wait for a generated track; music takes far longer than an image
+MUSIC_READ_TIMEOUT = float(os.getenv('MUSIC_READ_TIMEOUT', '300'))
 
-headers = {"Authorization": f"Bearer {HF_API_TOKEN}"}
+# Format and duration of the stored track, written next to it for the renderer
+MUSIC_MANIFEST = "music.json"
 
 def generate_music_prompt(background_music_prompt, scenes, overall_video_mood):
     """Dynamically generate a music prompt based on scene moods, pacing, and video theme."""
@@ -31,7 +31,7 @@ def generate_music_prompt(background_music_prompt, scenes, overall_video_mood):
     - **Scene Progression (0:10 - {len(scenes) * 10}):** Gradual evolution in tone, adapting to scene-specific moods and transitions:
       {', '.join([f'"{scene["mood_emotion"]}"' for scene in scenes])}.
     - **Climax ({(len(scenes) - 1) * 10} - {len(scenes) * 10}):** Emotionally intense, reflecting "{climax_mood}" with appropriate orchestral elements.
-    - **Transitions:** Ensure smooth blending between moods, considering transitions like {', '.join(transition_effects)}.
+    - **Transitions:** Ensure smooth blending between moods, considering transitions like {', '.join(sorted(transition_effects))}.
     
     - **Instrumentation:** Cinematic orchestra with adaptive use of strings, brass, war drums, and choir vocals.
     - **Tempo Dynamics:** Adjust tempo dynamically based on the emotional intensity of scenes.
@@ -41,42 +41,46 @@ def generate_music_prompt(background_music_prompt, scenes, overall_video_mood):
     """
 
 def generate_music(prompt, output_dir):
-    """Generate background music based on user text input using Hugging Face API."""
+    """Generate background music based on user text input using Hugging Face API.
+
+    The response is stored exactly as received (MusicGen answers with FLAC),
+    as background_music.<format> sniffed from its magic bytes, and its
+    duration is read from the headers into music.json. Returns that metadata
+    ({"file", "format", "duration"}), or None if no music was produced.
+    """
     payload = {"inputs": prompt}
-    response = requests.post(API_URL_MUSICGEN, headers=headers, json=payload)
-    
-    # os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+    try:
+        content = inference_client.post(API_URL_MUSICGEN, payload, timeout=(INFERENCE_CONNECT_TIMEOUT, MUSIC_READ_TIMEOUT), label="Music")
+    except InferenceError as e:
+        logger.error(f"Error generating music: {e.detail}")
+        return None
+
+    audio_format = sniff_audio_format(content)
+    if audio_format is None:
+        logger.error(f"Music response is not a recognised audio format ({content[:16]!r})")
+        return None
+
     output_dir.mkdir(parents=True, exist_ok=True)
-    output_path = output_dir / "background_music.mp3"
-    if response.status_code == 200:
-        with open(output_path, "wb") as f:
-            f.write(response.content)
-        logger.info(f"Music saved as {output_path}")
-        
-        # # Convert FLAC to MP3 using ffmpeg
-        try:
-            converted_path = f"{output_path}".replace('.mp3', '_converted.mp3')
-            subprocess.run(['ffmpeg', '-i', output_path, '-acodec', 'libmp3lame', converted_path], check=True)
-            logger.info(f"Music converted to MP3 and saved as {converted_path}")
-            
-            # Remove the original FLAC file
-            os.remove(output_path)
-            
-            # Rename the converted file to the original name
-            os.rename(converted_path, output_path)
-            
-            # Load the audio clip for further processing (optional)
-            # music_clip = AudioFileClip(output_path)
-            music_clip = AudioFileClip(str(output_path))
-
-            logger.info(f"Music duration: {music_clip.duration} seconds")
-            music_clip.close()
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Error during FLAC to MP3 conversion: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-    else:
-        logger.error(f"Error generating music: {response.json()}")
+    output_path = output_dir / f"background_music.{audio_format}"
+    with open(output_path, "wb") as f:
+        f.write(content)
+
+    info = {"file": output_path.name, "format": audio_format, "duration": audio_duration(content, audio_format)}
+    with open(output_dir / MUSIC_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=4)
+    logger.info(f"Music saved as {output_path} | Duration: {info['duration']} seconds")
+    return info
+
+
+def load_music_info(music_folder):
+    """Metadata written by generate_music, with `path` added, or None if there is no track."""
+    manifest_path = os.path.join(music_folder, MUSIC_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        info = json.load(f)
+    info["path"] = os.path.join(music_folder, info["file"])
+    return info if os.path.exists(info["path"]) else None
 
 
        
@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from backend.logging_config import setup_logging, submit_in_context
+from backend.metrics import timed
+
+logger = setup_logging(log_file='app.log')
+
+
+class StageFailed(Exception):
+    """Raised when a pipeline stage raises; wraps the original error."""
+
+    def __init__(self, stage, error):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Pipeline:
+    """Run named stages as a dependency graph on a thread pool.
+
+    Each stage is a callable that receives the results of its dependencies as
+    keyword arguments (keyed by stage name). A stage starts as soon as all of
+    its dependencies have finished, so independent stages run concurrently.
+    `on_stage_done(name, completed, total)` is called after each stage succeeds.
+    """
+
+    def __init__(self, max_workers=None, on_stage_done=None):
+        self.max_workers = max_workers
+        self.on_stage_done = on_stage_done
+        self.stages = {}
+        self.timings = {}
+
+    def add_stage(self, name, func, deps=()):
+        """Register a stage. Dependencies must already be registered."""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already registered.")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'.")
+        self.stages[name] = (func, tuple(deps))
+        return self
+
+    def _run_stage(self, name, func, kwargs):
+        start = time.perf_counter()
+        logger.info(f"Stage '{name}' started")
+        try:
+            with timed(name):
+                return func(**kwargs)
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def run(self):
+        """Execute every stage and return a dict of stage name -> result."""
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers or max(1, len(self.stages))) as executor:
+            while pending or running:
+                for name, (func, deps) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        kwargs = {dep: results[dep] for dep in deps}
+                        # Stages log with the caller's context (e.g. its run id)
+                        running[submit_in_context(executor, self._run_stage, name, func, kwargs)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        # Let stages already in flight finish, but start nothing new
+                        pending.clear()
+                        wait(running)
+                        raise StageFailed(name, e) from e
+                    if self.on_stage_done:
+                        self.on_stage_done(name, len(results), len(self.stages))
+
+        self.timings["total"] = time.perf_counter() - start
+        logger.info("Pipeline timings: " + ", ".join(f"{k}={v:.2f}s" for k, v in self.timings.items()))
+        return results
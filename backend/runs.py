@@ -0,0 +1,308 @@
+import json
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from backend.text_generator import script_service, save_json
+from backend.image_generator import generate_images_from_script, generate_scene_image, build_image_prompt, image_request_key, IMAGE_MAX_IN_FLIGHT
+from backend.audio_generator import generate_audio, load_voiceover_manifest, share_voiceover, voiceover_key, TTS_WORKERS
+from backend.tts_backends import TTS_BACKEND
+from backend.music_generator import generate_music, generate_music_prompt, load_music_info
+from backend.video_generator import create_final_video, resolve_renderer, VIDEO_RENDERER, VIDEO_SIZE
+from backend.image_normalizer import normalize_images, normalized_path, KEN_BURNS_HEADROOM
+from backend.cache import cache_key
+from backend.assets import AssetIndex
+from backend.manifest import RunManifest
+from backend.pipeline import Pipeline
+from backend.workspaces import WorkspaceManager
+from backend.logging_config import setup_logging, log_context, submit_in_context
+from backend.metrics import timed
+from backend.limits import resource_limits
+
+logger = setup_logging(log_file='app.log')
+
+# Directories for storing outputs
+current_path = Path(__file__).resolve()
+root_path = current_path.parent.parent
+output_data_dir = root_path / 'output/video'
+
+# Every run gets its own workspace under output_data_dir, reaped by TTL and quota
+workspaces = WorkspaceManager(output_data_dir)
+
+SCRIPT_FILE = "video_script.json"
+FINAL_VIDEO_FILE = "final_video.mp4"
+
+# The render writes here and is renamed to FINAL_VIDEO_FILE once complete
+PARTIAL_VIDEO_FILE = "final_video.partial.mp4"
+
+
+class SceneDispatcher:
+    """Starts image and voiceover work for each scene while the script is still streaming.
+
+    Used as the script service's `on_scene` callback. Work is only started
+    for scenes whose artifacts are not already fresh in the manifest; the
+    stages later `take_*` the results whose inputs still match the final
+    script and redo anything else.
+    """
+
+    def __init__(self, manifest, images_dir, audio_dir):
+        self.manifest = manifest
+        self.images_dir = Path(images_dir)
+        self.audio_dir = Path(audio_dir)
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        self.audio_dir.mkdir(parents=True, exist_ok=True)
+        self.streamed = []
+        self.images = {}  # scene number -> (inputs hash, future)
+        self.voiceovers = {}
+        self._lines = {}  # voiceover inputs hash -> (first scene number, future), so a repeated line is synthesized once
+        self._image_pool = ThreadPoolExecutor(max_workers=max(1, IMAGE_MAX_IN_FLIGHT), thread_name_prefix="scene-image")
+        self._voice_pool = ThreadPoolExecutor(max_workers=max(1, TTS_WORKERS), thread_name_prefix="scene-voice")
+
+    def __call__(self, index, scene):
+        self.streamed.append(scene)
+        scene_no = index + 1
+
+        prompt = build_image_prompt(scene)
+        image_hash = image_request_key(prompt)
+        if not self.manifest.is_fresh(f"image:{scene_no}", image_hash):
+            future = submit_in_context(self._image_pool, generate_scene_image, prompt, f"{self.images_dir}/scene_{scene_no}.png", scene_no)
+            self.images[scene_no] = (image_hash, future)
+
+        text = scene.get("voiceover", "").strip()
+        if text:
+            voice_hash = voiceover_key(text, "en", TTS_BACKEND)
+            if not self.manifest.is_fresh(f"voiceover:{scene_no}", voice_hash):
+                # A retried script may put a different line in this scene's file
+                self._lines = {key: line for key, line in self._lines.items() if line[0] != scene_no}
+                if voice_hash in self._lines:
+                    future = self._share_voiceover(*self._lines[voice_hash], scene_no)
+                else:
+                    # Scene numbers come from the position in the script, so pass the scenes streamed so far
+                    partial = {"scenes": list(self.streamed)}
+                    future = submit_in_context(self._voice_pool, generate_audio, partial, self.audio_dir, scenes={scene_no})
+                    self._lines[voice_hash] = (scene_no, future)
+                self.voiceovers[scene_no] = (voice_hash, future)
+
+    def _share_voiceover(self, source_scene, source_future, scene_no):
+        """Future for `scene_no` that links the voiceover of `source_scene` once it is done.
+
+        Runs as a done callback rather than a pool task, so a scene waiting for
+        its line never holds a worker the line itself needs.
+        """
+        shared = Future()
+
+        def link(done):
+            try:
+                done.result()
+                share_voiceover(self.audio_dir, source_scene, scene_no)
+            except Exception as e:
+                shared.set_exception(e)
+            else:
+                shared.set_result(True)
+
+        source_future.add_done_callback(link)
+        return shared
+
+    def _take(self, started, inputs):
+        done = set()
+        for scene_no, (inputs_hash, future) in started.items():
+            if inputs.get(scene_no) != inputs_hash:
+                # Superseded by a retried script; its result (or error) no longer matters
+                future.exception()
+                continue
+            if future.result() is not False:
+                done.add(scene_no)
+        return done
+
+    def take_images(self, image_inputs):
+        """Scene numbers whose streamed image finished and matches `image_inputs`."""
+        return self._take(self.images, image_inputs)
+
+    def take_voiceovers(self, voiceover_inputs):
+        """Scene numbers whose streamed voiceover finished and matches `voiceover_inputs`."""
+        return self._take(self.voiceovers, voiceover_inputs)
+
+    def shutdown(self):
+        self._image_pool.shutdown(wait=True)
+        self._voice_pool.shutdown(wait=True)
+
+
+def run_video_pipeline(job, topic, run_id=None, stream=False, use_script_cache=True):
+    """Generate (or resume) the video for a topic inside a job worker; returns the MP4 path.
+
+    Every run lives in its own workspace, output/video/<run_id>, with a manifest
+    of the artifacts it produced; concurrent runs never share files. Re-running
+    with the same run_id only rebuilds artifacts that are missing or whose
+    inputs changed, e.g. editing one scene's voiceover in video_script.json
+    redoes that TTS call and the final render only.
+
+    With `stream` the render is a fragmented MP4 and `job.output` points at the
+    file while it is written, so it can be served before the job finishes.
+    `use_script_cache=False` asks the model for a new script even if the
+    topic was scripted before.
+    """
+    run_id = run_id or job.id
+    with log_context(run_id=run_id), workspaces.acquire(run_id) as run_dir:
+        manifest = RunManifest(run_dir)
+        manifest.set_meta(run_id=run_id, topic=topic)
+        dispatcher = SceneDispatcher(manifest, run_dir / 'output_images', run_dir / 'output_audio')
+        try:
+            return _build_run(job, topic, run_id, run_dir, manifest, dispatcher, stream, use_script_cache)
+        finally:
+            dispatcher.shutdown()
+
+
+def _build_run(job, topic, run_id, run_dir, manifest, dispatcher, stream=False, use_script_cache=True):
+    images_output_dir = dispatcher.images_dir
+    audio_output_dir = dispatcher.audio_dir
+    music_output_dir = run_dir / 'output_music'
+    final_video_path = run_dir / FINAL_VIDEO_FILE
+
+    # Generate the video script; image and voiceover work starts as each scene streams in
+    job.update(stage="script")
+    script_inputs = cache_key("script", topic)
+    if not manifest.is_fresh("script", script_inputs):
+        with timed("script"):
+            script = script_service.generate(topic, on_scene=dispatcher, use_cache=use_script_cache)
+
+        # # Save the generated script to a JSON file
+        save_json(script, run_dir)
+        manifest.record("script", script_inputs, SCRIPT_FILE)
+    else:
+        logger.info(f"Run {run_id}: reusing existing video script")
+        # Read the saved video script (it may have been edited since the last run)
+        json_file = run_dir / SCRIPT_FILE
+        with json_file.open("r", encoding="utf-8") as file:
+            script = json.load(file)
+    scenes = script["scenes"]
+
+    # Work out which artifacts are missing or stale
+    image_inputs = {i: image_request_key(build_image_prompt(scene)) for i, scene in enumerate(scenes, 1)}
+    voiceover_inputs = {
+        i: voiceover_key(scene.get("voiceover", "").strip(), "en", TTS_BACKEND)
+        for i, scene in enumerate(scenes, 1) if scene.get("voiceover", "").strip()
+    }
+    music_prompt = generate_music_prompt(script["background_music_prompt"], scenes, script["overall_video_mood"])
+    # The prompt lists the transitions sorted, so this key is the same in every process
+    music_inputs = cache_key("music", music_prompt)
+    frames_inputs = {i: cache_key("frames", h, VIDEO_SIZE, KEN_BURNS_HEADROOM) for i, h in image_inputs.items()}
+
+    stale_images = {i for i, h in image_inputs.items() if not manifest.is_fresh(f"image:{i}", h)}
+    stale_voiceovers = {i for i, h in voiceover_inputs.items() if not manifest.is_fresh(f"voiceover:{i}", h)}
+    music_stale = not manifest.is_fresh("music", music_inputs)
+    logger.info(f"Run {run_id}: rebuilding images {sorted(stale_images)}, voiceovers {sorted(stale_voiceovers)}, music={music_stale}")
+
+    # Where every scene's assets are; stages add what they build and the renderer reads it
+    assets = AssetIndex.from_manifest(manifest, audio_output_dir)
+
+    def images():
+        streamed = dispatcher.take_images(image_inputs)
+        remaining = stale_images - streamed
+        failed = generate_images_from_script(script, images_output_dir, scenes=remaining) if remaining else []
+        for i in stale_images - set(failed):
+            manifest.record(f"image:{i}", image_inputs[i], images_output_dir / f"scene_{i}.png")
+            assets.add_image(i, images_output_dir / f"scene_{i}.png", image_inputs[i])
+
+    def voiceover():
+        streamed = dispatcher.take_voiceovers(voiceover_inputs)
+        remaining = stale_voiceovers - streamed
+        if remaining:
+            generate_audio(script, audio_output_dir, scenes=remaining)
+        durations = load_voiceover_manifest(audio_output_dir)
+        for i in stale_voiceovers:
+            manifest.record(f"voiceover:{i}", voiceover_inputs[i], audio_output_dir / f"scene_{i}.mp3")
+            if i in durations:
+                assets.add_voiceover(i, audio_output_dir / f"scene_{i}.mp3", durations[i], voiceover_inputs[i])
+
+    def normalize(**_):
+        # Decode every image once, fitted to the output size, for the renderer to memory-map
+        if VIDEO_SIZE is None:
+            return
+        rendered = [i for i in image_inputs if manifest.is_fresh(f"image:{i}", image_inputs[i])]
+        stale = [
+            (i, images_output_dir / f"scene_{i}.png", normalized_path(images_output_dir / f"scene_{i}.png", VIDEO_SIZE))
+            for i in rendered
+            if not manifest.is_fresh(f"frames:{i}", frames_inputs[i])
+        ]
+        for i, _, _ in stale:
+            assets.add_frames(i, None)  # an array of the previous image must not be rendered
+        # Only the streaming and MoviePy renderers read the arrays; the ffmpeg
+        # filter graphs decode and scale the PNGs themselves
+        renderer = resolve_renderer(VIDEO_RENDERER, len(rendered))
+        if renderer not in ("streaming", "moviepy"):
+            logger.info(f"Run {run_id}: the {renderer} renderer reads the PNGs, skipping normalization")
+            return
+        for i, path in normalize_images(stale, VIDEO_SIZE).items():
+            manifest.record(f"frames:{i}", frames_inputs[i], path)
+            assets.add_frames(i, path)
+
+    def music():
+        if not music_stale:
+            return
+        info = generate_music(music_prompt, music_output_dir)
+        if info is not None:
+            manifest.record("music", music_inputs, music_output_dir / info["file"])
+
+    def render(**_):
+        # Music is optional; a track left over from an older prompt is not used
+        music_path = manifest.artifact_path("music") if manifest.is_fresh("music", music_inputs) else None
+        # The track's length was read from its headers when it was stored
+        music_info = load_music_info(music_output_dir) if music_path else None
+        music_duration = music_info.get("duration") if music_info else None
+
+        # The final video depends on every upstream artifact, the script fields
+        # plan_scenes hands the renderer (each scene's transition) and the renderer
+        final_inputs = cache_key(
+            "final",
+            [manifest.inputs_hash(f"image:{i}") for i in image_inputs],
+            [manifest.inputs_hash(f"voiceover:{i}") for i in voiceover_inputs],
+            [scene.get("suggested_transition_effect", "fade-in").lower() for scene in scenes],
+            music_inputs if music_path else None,
+            VIDEO_RENDERER,
+            VIDEO_SIZE,
+        )
+        if manifest.is_fresh("final", final_inputs):
+            logger.info(f"Run {run_id}: final video is up to date")
+            job.output = final_video_path
+            return
+        partial_video_path = run_dir / PARTIAL_VIDEO_FILE
+        partial_video_path.unlink(missing_ok=True)
+        # Renders are CPU-bound; runs beyond the render limit queue here while
+        # the network stages of other runs overlap the renders in progress
+        with resource_limits.slot("render"):
+            job.output = partial_video_path
+            create_final_video(script, str(images_output_dir), str(audio_output_dir), str(music_path) if music_path else None, str(partial_video_path), fragmented=stream, assets=assets, music_duration=music_duration)
+        # Readers that opened the partial file keep following it through the rename
+        partial_video_path.replace(final_video_path)
+        job.output = final_video_path
+        manifest.record("final", final_inputs, FINAL_VIDEO_FILE)
+
+    # Images, voiceover and music are independent of each other and run
+    # concurrently; images are normalized as soon as they are all in, and the
+    # render waits on everything.
+    # The script counts as the first of (stages + 1) steps
+    pipeline = Pipeline(on_stage_done=lambda name, done, total: job.update(stage=name, progress=(done + 1) / (total + 1)))
+    pipeline.add_stage("images", images)
+    pipeline.add_stage("voiceover", voiceover)
+    pipeline.add_stage("music", music)
+    pipeline.add_stage("normalize", normalize, deps=("images",))
+    pipeline.add_stage("render", render, deps=("normalize", "voiceover", "music"))
+    job.update(progress=1 / (len(pipeline.stages) + 1))
+    pipeline.run()
+    job.timings = dict(pipeline.timings)
+
+    return final_video_path
+
+
+def is_valid_run_id(run_id):
+    """Run ids are the hex job ids that created them; anything else could escape output_data_dir."""
+    return bool(re.fullmatch(r"[0-9a-f]{32}", run_id))
+
+
+def load_run(run_id):
+    """Manifest of an existing run, or None if the run does not exist."""
+    if not is_valid_run_id(run_id):
+        return None
+    run_dir = workspaces.path_for(run_id)
+    if not (run_dir / "manifest.json").exists():
+        return None
+    return RunManifest(run_dir)
@@ -0,0 +1,224 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from backend.cache import cache_key
+
+
+# "sqlite" shares cached scripts between worker processes through one file, "memory" is per process
+SCRIPT_CACHE_BACKEND = os.getenv('SCRIPT_CACHE_BACKEND', 'sqlite')
+SCRIPT_CACHE_PATH = os.getenv('SCRIPT_CACHE_PATH', str(Path(__file__).resolve().parent.parent / 'output/cache/scripts.sqlite3'))
+
+# Seconds a cached script stays valid, and how many scripts are kept (least recently used go first)
+SCRIPT_CACHE_TTL = float(os.getenv('SCRIPT_CACHE_TTL', str(7 * 24 * 3600)))
+SCRIPT_CACHE_MAX_ENTRIES = int(os.getenv('SCRIPT_CACHE_MAX_ENTRIES', '1000'))
+
+
+def normalize_topic(topic):
+    """Canonical form of a topic so trivially different spellings share a cache entry."""
+    topic = unicodedata.normalize("NFKC", topic).casefold()
+    topic = re.sub(r"\s+", " ", topic).strip()
+    return topic.strip(" .!?;:,\"'")
+
+
+class ScriptStore:
+    """Storage behind the script cache.
+
+    Values are JSON strings stored with their creation time. `get` returns
+    (value, created_at) or None and counts as a use for LRU eviction; `put`
+    evicts the least recently used entries beyond `max_entries`.
+    """
+
+    name = None
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def put(self, key, value, created_at):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryScriptStore(ScriptStore):
+    """In-process LRU store."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=SCRIPT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, created_at), least recently used first
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, value, created_at):
+        with self._lock:
+            self._entries[key] = (value, created_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteScriptStore(ScriptStore):
+    """LRU store in a SQLite file that several worker processes can share."""
+
+    name = "sqlite"
+
+    def __init__(self, path=SCRIPT_CACHE_PATH, max_entries=SCRIPT_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scripts ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scripts_accessed ON scripts (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call keeps the store safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:  # commits, or rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM scripts WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE scripts SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return row
+
+    def put(self, key, value, created_at):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scripts (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, created_at, time.time()),
+            )
+            cursor = conn.execute(
+                "DELETE FROM scripts WHERE key IN (SELECT key FROM scripts ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            return cursor.rowcount
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM scripts WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM scripts").fetchone()[0]
+
+
+STORES = {
+    MemoryScriptStore.name: MemoryScriptStore,
+    SQLiteScriptStore.name: SQLiteScriptStore,
+}
+
+
+def get_script_store(name=None):
+    """Instantiate a registered store by name (defaults to SCRIPT_CACHE_BACKEND)."""
+    name = name or SCRIPT_CACHE_BACKEND
+    if name not in STORES:
+        raise ValueError(f"Unknown script cache backend '{name}'. Available: {', '.join(STORES)}")
+    return STORES[name]()
+
+
+class ScriptCache:
+    """Generated scripts keyed by normalized topic, prompt version and model.
+
+    Entries older than `ttl` seconds are treated as misses and dropped. The
+    store is created on first use, so importing this module touches no disk.
+    """
+
+    def __init__(self, store=None, ttl=SCRIPT_CACHE_TTL):
+        self._store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        with self._lock:
+            if self._store is None:
+                self._store = get_script_store()
+            return self._store
+
+    @staticmethod
+    def key(topic, prompt_version, model_name):
+        return cache_key("script", normalize_topic(topic), prompt_version, model_name)
+
+    def get(self, topic, prompt_version, model_name):
+        """Cached script for the topic, or None."""
+        key = self.key(topic, prompt_version, model_name)
+        entry = self.store.get(key)
+        if entry is not None and time.time() - entry[1] > self.ttl:
+            self.store.delete(key)
+            entry = None
+            with self._lock:
+                self.expired += 1
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return json.loads(entry[0]) if entry is not None else None
+
+    def put(self, topic, prompt_version, model_name, script):
+        key = self.key(topic, prompt_version, model_name)
+        evicted = self.store.put(key, json.dumps(script, ensure_ascii=False), time.time())
+        with self._lock:
+            self.evictions += evicted
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "backend": self._store.name if self._store is not None else SCRIPT_CACHE_BACKEND,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "ttl_seconds": self.ttl,
+            }
+        stats["entries"] = len(self.store)
+        return stats
+
+
+# Shared by every ScriptService in the process
+script_cache = ScriptCache()
@@ -0,0 +1,168 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from backend.logging_config import setup_logging
+
+logger = setup_logging(log_file='app.log')
+
+
+# Model used by the script service unless one is passed explicitly
+SCRIPT_MODEL = os.getenv('SCRIPT_MODEL', 'gemini')
+
+# Gemini model name
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-pro')
+
+# JSON schema the model is asked to answer with (structured output)
+SCENE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "timestamp": {"type": "string"},
+        "voiceover": {"type": "string"},
+        "scene_description": {"type": "string"},
+        "character_object_details": {"type": "string"},
+        "shot_type_camera_angle": {"type": "string"},
+        "mood_emotion": {"type": "string"},
+        "suggested_transition_effect": {"type": "string"},
+    },
+    "required": [
+        "timestamp", "voiceover", "scene_description", "character_object_details",
+        "shot_type_camera_angle", "mood_emotion", "suggested_transition_effect",
+    ],
+}
+VIDEO_SCRIPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "video_title": {"type": "string"},
+        "scenes": {"type": "array", "items": SCENE_SCHEMA},
+        "overall_video_mood": {"type": "string"},
+        "background_music_prompt": {"type": "string"},
+    },
+    "required": ["video_title", "scenes", "overall_video_mood", "background_music_prompt"],
+}
+
+
+class ScriptModel:
+    """Interface for the language models that write video scripts.
+
+    `stream` yields the response text in chunks as the model produces it;
+    joined, the chunks are one JSON document matching VIDEO_SCRIPT_SCHEMA.
+    Implementations raise on failure; retries are handled by the caller.
+    """
+
+    name = None
+
+    @property
+    def version(self):
+        """Identifies what the model would write; part of the script cache key."""
+        return getattr(self, "model_name", self.name)
+
+    def stream(self, prompt):
+        raise NotImplementedError
+
+
+class GeminiScriptModel(ScriptModel):
+    """Google Gemini with JSON structured output; the model object is built once and reused."""
+
+    name = "gemini"
+
+    def __init__(self, model_name=GEMINI_MODEL, api_key=None):
+        import google.generativeai as genai
+
+        self.model_name = model_name
+        api_key = api_key or os.getenv('GEN_API_KEY')
+        if not api_key:
+            logger.error("GEN_API_KEY not found in environment variables.")
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(
+            model_name,
+            generation_config=genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=VIDEO_SCRIPT_SCHEMA,
+            ),
+        )
+        logger.info(f"Gemini model {model_name} configured for structured output.")
+
+    def stream(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # A chunk without text parts (e.g. only a finish reason)
+                continue
+            if text:
+                yield text
+
+
+class StubScriptModel(ScriptModel):
+    """Offline stand-in for tests and benchmarks.
+
+    Writes a deterministic `n_scenes` script for the prompt's topic, streamed
+    in `chunk_size` character pieces with `latency` seconds spread across
+    them, and fails with probability `failure_rate`.
+    """
+
+    name = "stub"
+
+    def __init__(self, n_scenes=4, latency=0.0, chunk_size=64, failure_rate=0.0, seed=None):
+        self.n_scenes = n_scenes
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def script_for(self, topic):
+        moods = ["calm", "curious", "tense", "triumphant"]
+        transitions = ["fade-in", "crossfade", "zoom out", "quick cuts"]
+        return {
+            "video_title": topic,
+            "scenes": [
+                {
+                    "timestamp": f"00:{i * 10:02d} - 00:{i * 10 + 10:02d}",
+                    "voiceover": f"Part {i + 1} of the story about {topic}.",
+                    "scene_description": f"Scene {i + 1} illustrating {topic}.",
+                    "character_object_details": "A narrator and the main subject.",
+                    "shot_type_camera_angle": "Wide shot",
+                    "mood_emotion": moods[i % len(moods)],
+                    "suggested_transition_effect": transitions[i % len(transitions)],
+                }
+                for i in range(self.n_scenes)
+            ],
+            "overall_video_mood": "Inspirational",
+            "background_music_prompt": f"A cinematic soundtrack for a video about {topic}.",
+        }
+
+    def stream(self, prompt):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if fail:
+            raise ConnectionError("Injected script model failure")
+
+        match = re.search(r'\*\*Topic:\*\* "(.*)"', prompt)
+        text = json.dumps(self.script_for(match.group(1) if match else "stub topic"), indent=2)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
+
+
+MODELS = {
+    GeminiScriptModel.name: GeminiScriptModel,
+    StubScriptModel.name: StubScriptModel,
+}
+
+
+def get_script_model(name=None):
+    """Instantiate a registered script model by name (defaults to SCRIPT_MODEL)."""
+    name = name or SCRIPT_MODEL
+    if name not in MODELS:
+        raise ValueError(f"Unknown script model '{name}'. Available: {', '.join(MODELS)}")
+    return MODELS[name]()
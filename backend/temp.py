@@ -45,37 +45,22 @@ logger = setup_logging(log_file='app.log')
 #     main()
         
     
-import os
-import re
-from backend.logging_config import setup_logging
-from fastapi import FastAPI, Form
-from fastapi.responses import FileResponse
-from pathlib import Path
-import json
-from backend.text_generator import generate_video_script, extract_json, save_json
-from backend.image_generator import generate_images_from_script
-from backend.audio_generator import generate_audio
-from backend.music_generator import generate_music, generate_music_prompt
-from backend.video_generator import create_final_video,get_closest_file
-from backend.logging_config import setup_logging
-from fastapi.staticfiles import StaticFiles
-import moviepy.editor as mp
-
-logger = setup_logging(log_file='app.log')
-
+def render_saved_run():
+    """Re-render output/video4 from its saved script and assets."""
+    current_path = Path(__file__).resolve()
+    root_path = current_path.parent.parent
+    output_data_dir = root_path / 'output/video4'
+    output_data_dir.mkdir(parents=True, exist_ok=True)
+    images_output_dir = output_data_dir / 'output_images'
+    audio_output_dir = output_data_dir / 'output_audio'
+    music_output_dir = output_data_dir / 'output_music'
+    json_file = output_data_dir / "video_script.json"
+    with json_file.open("r", encoding="utf-8") as file:
+        script = json.load(file)
+    final_video_path = output_data_dir / "final_video.mp4"
+    create_final_video(script, str(images_output_dir), str(audio_output_dir), str(music_output_dir/"background_music.mp3"), str(final_video_path))
 
 
-import json
-from pathlib import Path
-current_path = Path(__file__).resolve()
-root_path = current_path.parent.parent
-output_data_dir = root_path / 'output/video4'
-output_data_dir.mkdir(parents=True, exist_ok=True)
-images_output_dir = output_data_dir / 'output_images'
-audio_output_dir = output_data_dir / 'output_audio'
-music_output_dir = output_data_dir / 'output_music'
-json_file = output_data_dir / "video_script.json"
-with json_file.open("r", encoding="utf-8") as file:
-    script = json.load(file)   
-final_video_path = output_data_dir / "final_video.mp4"
-create_final_video(script, str(images_output_dir), str(audio_output_dir), str(music_output_dir/"background_music.mp3"), str(final_video_path))
\ No newline at end of file
+# Only when run as a script; importing this module must not start a render
+if __name__ == '__main__':
+    render_saved_run()
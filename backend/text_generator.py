@@ -1,36 +1,38 @@
-import google.generativeai as genai
-from dotenv import load_dotenv
 import os
 import re
 import json
-from backend.logging_config import setup_logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from backend.logging_config import setup_logging, submit_in_context
+from backend.script_models import get_script_model
+from backend.script_cache import script_cache
+from backend.limits import resource_limits
 
 # Setup logging
 logger = setup_logging(log_file='app.log')
 
-# Load environment variables
-load_dotenv()
+# Topics scripted at the same time by ScriptService.generate_many
+SCRIPT_WORKERS = int(os.getenv('SCRIPT_WORKERS', '4'))
 
-# Get the API key for Google Generative AI
-GEN_API_KEY = os.getenv('GEN_API_KEY')
+# Attempts per topic when the model errors or returns unparseable JSON, and their backoff
+SCRIPT_MAX_RETRIES = int(os.getenv('SCRIPT_MAX_RETRIES', '3'))
+SCRIPT_BACKOFF_BASE = float(os.getenv('SCRIPT_BACKOFF_BASE', '2.0'))
+SCRIPT_BACKOFF_CAP = float(os.getenv('SCRIPT_BACKOFF_CAP', '30.0'))
 
-if not GEN_API_KEY:
-    logger.error("GEN_API_KEY not found in environment variables.")
-else:
-    logger.info("GEN_API_KEY loaded successfully.")
 
-try:
-    logger.info("Configuring the generative AI API...")
-    genai.configure(api_key=GEN_API_KEY)
-    logger.info("Generative AI API configured successfully.")
-except Exception as e:
-    logger.error(f"Error while configuring Generative AI API: {e}")
-    raise
+# Bump whenever build_script_prompt changes so cached scripts from the old prompt are not reused
+SCRIPT_PROMPT_VERSION = 1
 
-def generate_video_script(topic):
-    logger.info(f"Generating video script for topic: {topic}")
-    
-    prompt = f"""
+
+class ScriptGenerationError(RuntimeError):
+    """Raised when no valid script could be produced for a topic."""
+
+
+def build_script_prompt(topic):
+    """Prompt asking the model for the structured script of one topic."""
+    return f"""
     You are a professional AI video script generator. Given a video topic, generate a detailed script and structured breakdown for an AI-generated video.
 
     ## Instructions:
@@ -71,29 +73,212 @@ def generate_video_script(topic):
       "background_music_prompt": "A cinematic orchestral soundtrack with a dramatic build-up, matching the video's emotional tone."
     }}
     """
-    
+
+
+class ScriptStreamParser:
+    """Incrementally parse a streamed script, reporting each scene as soon as it is complete.
+
+    Chunks are scanned once, tracking string/escape state and nesting depth;
+    when an object inside the top-level "scenes" array closes it is decoded
+    on its own and returned from `feed`, so scene work can start before the
+    model has finished the rest of the script.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.scenes = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._key = None
+        self._scenes_depth = None  # depth inside the scenes array
+        self._scene_start = None
+
+    def feed(self, chunk):
+        """Add streamed text; returns the scenes completed by it."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":":
+                self._key = self._last_string
+            elif c in "{[":
+                if c == "[" and self._depth == 1 and self._key == "scenes":
+                    self._scenes_depth = self._depth + 1
+                elif c == "{" and self._scenes_depth is not None and self._depth == self._scenes_depth:
+                    self._scene_start = i
+                self._depth += 1
+                self._key = None
+            elif c in "}]":
+                self._depth -= 1
+                if c == "}" and self._scene_start is not None and self._depth == self._scenes_depth:
+                    scene = json.loads(text[self._scene_start:i + 1])
+                    self.scenes.append(scene)
+                    completed.append(scene)
+                    self._scene_start = None
+                elif c == "]" and self._scenes_depth is not None and self._depth == self._scenes_depth - 1:
+                    self._scenes_depth = None
+            elif c == ",":
+                self._key = None
+        self._pos = len(text)
+        return completed
+
+    def result(self):
+        """The complete script; raises ScriptGenerationError if the text is not valid JSON."""
+        script = extract_json(self.text)
+        if "error" in script:
+            raise ScriptGenerationError(script["error"])
+        if not isinstance(script.get("scenes"), list) or not script["scenes"]:
+            raise ScriptGenerationError("Script has no scenes")
+        return script
+
+
+class ScriptService:
+    """Writes video scripts with one shared model, for one topic or many at once.
+
+    The model (and its client) is created on first use and reused for every
+    request. Streams hold a "script" slot of the shared resource limits, so
+    concurrent jobs and batches queue for the model instead of all calling it
+    at once. Responses are streamed and parsed incrementally; `on_scene`
+    callbacks fire as each scene arrives. Model errors and unparseable
+    output are retried with jittered exponential backoff. Finished scripts
+    go to `cache`, keyed by normalized topic, prompt version and model, so a
+    repeated topic skips the model entirely.
+    """
+
+    def __init__(self, model=None, workers=SCRIPT_WORKERS, max_retries=SCRIPT_MAX_RETRIES, backoff_base=SCRIPT_BACKOFF_BASE, cache=script_cache):
+        self._model = model
+        self.cache = cache
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = get_script_model()
+            return self._model
+
+    def generate(self, topic, on_scene=None, use_cache=True):
+        """Script for `topic` as a dict; `on_scene(index, scene)` is called as scenes complete.
+
+        Scenes already reported by a failed attempt are not reported again;
+        the returned script is authoritative. `use_cache=False` always asks
+        the model (the fresh script still refreshes the cache). Raises
+        ScriptGenerationError.
+        """
+        if use_cache and self.cache is not None:
+            script = self.cache.get(topic, SCRIPT_PROMPT_VERSION, self.model.version)
+            if script is not None:
+                logger.info(f"Video script for topic '{topic}' served from cache")
+                if on_scene is not None:
+                    for index, scene in enumerate(script["scenes"]):
+                        on_scene(index, scene)
+                return script
+
+        logger.info(f"Generating video script for topic: {topic}")
+        prompt = build_script_prompt(topic)
+        reported = 0
+        for attempt in range(self.max_retries):
+            parser = ScriptStreamParser()
+            try:
+                with resource_limits.slot("script"):
+                    for chunk in self.model.stream(prompt):
+                        for scene in parser.feed(chunk):
+                            index = len(parser.scenes) - 1
+                            if on_scene is not None and index >= reported:
+                                on_scene(index, scene)
+                                reported = index + 1
+                script = parser.result()
+                logger.info(f"Script for '{topic}' has {len(script['scenes'])} scenes")
+                if self.cache is not None:
+                    self.cache.put(topic, SCRIPT_PROMPT_VERSION, self.model.version, script)
+                return script
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    logger.error(f"Error during video script generation for '{topic}': {e}")
+                    raise ScriptGenerationError(f"Video script generation failed: {e}") from e
+                delay = random.uniform(0, min(SCRIPT_BACKOFF_CAP, self.backoff_base * 2 ** attempt))
+                logger.warning(f"Script generation for '{topic}' failed ({e}), retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+    def generate_many(self, topics, on_result=None, workers=None, use_cache=True):
+        """Script many topics concurrently over the shared model.
+
+        Returns one {"topic", "script", "error", "seconds"} dict per topic, in
+        input order; `on_result` receives each one as soon as it finishes.
+        """
+        def run(topic):
+            start = time.perf_counter()
+            try:
+                script, error = self.generate(topic, use_cache=use_cache), None
+            except ScriptGenerationError as e:
+                script, error = None, str(e)
+            return {"topic": topic, "script": script, "error": error, "seconds": round(time.perf_counter() - start, 3)}
+
+        results = [None] * len(topics)
+        with ThreadPoolExecutor(max_workers=max(1, workers or self.workers)) as executor:
+            futures = {submit_in_context(executor, run, topic): i for i, topic in enumerate(topics)}
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if on_result is not None:
+                    on_result(result)
+        return results
+
+
+# Shared by every caller so the model is configured once per process
+script_service = ScriptService()
+
+
+def generate_video_script(topic):
+    """JSON text of the script for `topic`, or None on failure."""
     try:
-        logger.info("Sending prompt to the generative AI model...")
-        model = genai.GenerativeModel("gemini-1.5-pro")  
-        response = model.generate_content(prompt)
-        logger.info("Successfully received response from the AI model.")
-        return response.text
-    except Exception as e:
-        logger.error(f"Error during video script generation: {e}")
+        return json.dumps(script_service.generate(topic), ensure_ascii=False)
+    except ScriptGenerationError:
         return None
 
 
 def extract_json(text):
-    """Extract valid JSON from model output."""
+    """Extract valid JSON from model output.
+
+    Structured output is plain JSON; older free-text answers wrap it in
+    triple backticks or surround it with prose, so those are tried next.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
     try:
         # Find JSON between triple backticks (```)
         matches = re.findall(r"```json\s*(\{.*?\})\s*```|```\s*(\{.*?\})\s*```", text, re.DOTALL)
         if matches:
-            json_str = matches[0][0] if matches[0][0] else matches[0][1]  
+            json_str = matches[0][0] if matches[0][0] else matches[0][1]
             return json.loads(json_str)  # Convert to Python dictionary
-        else:
-            logger.error("No valid JSON found between triple backticks.")
-            return {"error": "No valid JSON found between triple backticks"}
+        start, end = text.find("{"), text.rfind("}")
+        if start != -1 and end > start:
+            return json.loads(text[start:end + 1])
+        logger.error("No valid JSON found in model output.")
+        return {"error": "No valid JSON found in model output"}
     except json.JSONDecodeError as e:
         logger.error(f"Invalid JSON format: {e}")
         return {"error": f"Invalid JSON format: {e}"}
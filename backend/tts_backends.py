@@ -0,0 +1,88 @@
+import io
+import os
+import random
+import threading
+import time
+
+
+# Engine used by generate_audio unless a backend is passed explicitly
+TTS_BACKEND = os.getenv('TTS_BACKEND', 'gtts')
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, 1152 samples (~26 ms)
+_SILENT_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+_FRAME_SECONDS = 1152 / 44100
+
+
+class TTSBackend:
+    """Interface for text-to-speech engines used by generate_audio.
+
+    Implementations return encoded MP3 bytes for one line of text and raise on
+    failure; retries and concurrency are handled by the caller. `name` is part
+    of the TTS cache key, so two engines never share cached audio.
+    """
+
+    name = None
+
+    def synthesize(self, text, language):
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS via gTTS (network)."""
+
+    name = "gtts"
+
+    def synthesize(self, text, language):
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text, lang=language).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+def silent_mp3(seconds):
+    """Valid MP3 payload of silence lasting roughly `seconds`."""
+    return _SILENT_FRAME * max(1, round(seconds / _FRAME_SECONDS))
+
+
+class FakeTTSBackend(TTSBackend):
+    """Offline stand-in for tests and benchmarks.
+
+    Sleeps `latency` seconds per call, fails with probability `failure_rate`
+    and returns silent MP3 whose length grows with the text (~15 chars/s).
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, language):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        time.sleep(self.latency)
+        if fail:
+            raise ConnectionError("Injected TTS failure")
+        return silent_mp3(len(text) / 15)
+
+
+BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    FakeTTSBackend.name: FakeTTSBackend,
+}
+
+
+def get_backend(name=None):
+    """Instantiate a registered backend by name (defaults to TTS_BACKEND)."""
+    name = name or TTS_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
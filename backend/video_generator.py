@@ -1,46 +1,78 @@
-import re
 import os
 import random
-import moviepy.editor as mp
-from moviepy.video.fx import fadein, fadeout
-from moviepy.video.fx.resize import resize
-from moviepy.video.fx.all import resize, crop
 from backend.logging_config import setup_logging
+from backend.assets import AssetIndex
+from backend.ffmpeg_renderer import render_with_ffmpeg, render_parallel, render_streaming, FRAGMENTED_MOVFLAGS
+from backend.media_info import image_size
+from backend.image_normalizer import parse_size
 
 
 logger = setup_logging(log_file='app.log')
 
+
+# "ffmpeg" renders the whole timeline as one native filter graph, "parallel" renders
+# scene segments on all cores and concatenates them, "streaming" feeds frames to one
+# encoder a scene at a time with flat memory, "moviepy" is the original path
+VIDEO_RENDERER = os.getenv('VIDEO_RENDERER', 'ffmpeg')
+
+# The single ffmpeg graph keeps every scene open, so its memory grows with the
+# scene count; longer plans are rendered with "streaming" instead
+RENDER_GRAPH_MAX_SCENES = int(os.getenv('RENDER_GRAPH_MAX_SCENES', '12'))
+
+# Output frame size, "WIDTHxHEIGHT" (720p vertical Shorts by default); images are
+# cover-fitted to it. Empty keeps the size of the first scene's image
+VIDEO_SIZE = parse_size(os.getenv('VIDEO_SIZE', '720x1280'))
+
 def get_closest_file(folder, start_time, prefix, extension):
     """Find the closest matching file (image or audio) based on the scene number."""
-    files = os.listdir(folder)
-
-    file_numbers = []
-    for f in files:
-        match = re.search(rf"{prefix}_(\d+)\.{extension}$", f)
-        if match:
-            file_numbers.append(int(match.group(1)))  # Convert matched number to int
+    kind = {"png": "image", "mp3": "voiceover"}.get(extension)
+    if prefix != "scene" or kind is None:
+        raise ValueError(f"Unsupported asset pattern {prefix}_N.{extension}")
 
-    if not file_numbers:
+    index = AssetIndex.from_folders(folder if kind == "image" else None, folder if kind == "voiceover" else None)
+    path = index.closest(start_time, kind)
+    if path is None:
         logger.warning(f"No matching files found in {folder} for {prefix} with {extension} extension.")
-        return None  # No matching files found
+    return path
 
-    # Find the closest scene number to the start_time
-    closest_scene = min(file_numbers, key=lambda x: abs(x - start_time))
-    
-    return os.path.join(folder, f"{prefix}_{closest_scene}.{extension}")
 
+KEN_BURNS_EFFECTS = ["in", "out", "left", "right", "up", "down", None]  # `None` for no effect
+
+def choose_ken_burns(rng=random):
+    """Randomly pick a Ken Burns effect (zoom or pan) and zoom factor for one scene."""
+    return {
+        "effect": rng.choice(KEN_BURNS_EFFECTS),
+        "zoom": rng.uniform(1.05, 1.2),  # Random zoom factor between 1.05x and 1.2x
+    }
+
+
+def _pan(image_clip, x_at, y_at):
+    """Moving crop; x_at / y_at map scene progress (0..1) to the window position (0..1)."""
+    from moviepy.video.fx.resize import resize
+
+    w, h = image_clip.size
+    scaled = resize(image_clip, 1 / 0.9)
+    sw, sh = scaled.size
+
+    def frame(get_frame, t):
+        progress = min(1.0, t / image_clip.duration)
+        x = int(round(x_at(progress) * (sw - w)))
+        y = int(round(y_at(progress) * (sh - h)))
+        return get_frame(t)[y:y + h, x:x + w]
 
+    return scaled.fl(frame)
+
+
+def apply_ken_burns(image_clip, motion=None):
+    """Apply a Ken Burns effect (zoom or pan), chosen at random unless `motion` is given."""
+    from moviepy.video.fx.resize import resize
 
-def apply_ken_burns(image_clip):
-    """Apply a random Ken Burns effect (zoom or pan)."""
     w, h = image_clip.size  # Get image width & height
-    
-    # Randomly select an effect
-    effects = ["in", "out", "left", "right", "up", "down", None]  # `None` for no effect
-    chosen_effect = random.choice(effects)
-    
-    zoom_factor = random.uniform(1.05, 1.2)  # Random zoom factor between 1.05x and 1.2x
-    
+
+    motion = motion or choose_ken_burns()
+    chosen_effect = motion["effect"]
+    zoom_factor = motion["zoom"]
+
     # Apply Zoom Effect
     if chosen_effect == "in":
         zoom_clip = resize(image_clip, lambda t: 1 + (zoom_factor - 1) * (t / image_clip.duration))
@@ -49,74 +81,163 @@ def apply_ken_burns(image_clip):
     else:
         zoom_clip = image_clip  # No zoom
 
-    # Apply Pan Effect
+    # Apply Pan Effect: slide a w x h window across the image scaled up for 10% headroom
     if chosen_effect == "left":
-        pan_clip = crop(zoom_clip, x1=lambda t: (t / zoom_clip.duration) * w * 0.1, width=w, height=h)
+        pan_clip = _pan(zoom_clip, lambda p: p, lambda p: 0.5)
     elif chosen_effect == "right":
-        pan_clip = crop(zoom_clip, x1=lambda t: w * 0.1 - (t / zoom_clip.duration) * w * 0.1, width=w, height=h)
+        pan_clip = _pan(zoom_clip, lambda p: 1 - p, lambda p: 0.5)
     elif chosen_effect == "up":
-        pan_clip = crop(zoom_clip, y1=lambda t: (t / zoom_clip.duration) * h * 0.1, width=w, height=h)
+        pan_clip = _pan(zoom_clip, lambda p: 0.5, lambda p: p)
     elif chosen_effect == "down":
-        pan_clip = crop(zoom_clip, y1=lambda t: h * 0.1 - (t / zoom_clip.duration) * h * 0.1, width=w, height=h)
+        pan_clip = _pan(zoom_clip, lambda p: 0.5, lambda p: 1 - p)
     else:
         pan_clip = zoom_clip  # No pan
     
     return pan_clip
 
 
-def create_final_video(script_data, images_folder, voiceover_folder, bg_music_path, output_video_path):
-    """Creates the final video using generated images, voiceovers, and background music."""
+def plan_scenes(script_data, images_folder, voiceover_folder, rng=random, assets=None):
+    """Build the render timeline: one entry per scene with its image, voiceover and duration.
 
-    clips = []  # List to store video clips
+    Scenes are looked up in `assets`, the run's AssetIndex; without one the
+    folders are indexed with a single scan each. Durations come from the
+    voiceover manifest and a voiceover's headers are only read when it has no
+    entry. The Ken Burns motion is picked here so every renderer draws the same one.
+    `frames` is the scene's normalized image array, if the run built one.
+    """
+    if assets is None:
+        assets = AssetIndex.from_folders(images_folder, voiceover_folder)
 
+    plan = []
     for idx, scene in enumerate(script_data["scenes"]):
-        timestamp = scene["timestamp"]
-        start_time, end_time = map(lambda x: int(x.split(":")[1]), timestamp.split(" - "))
-        duration = end_time - start_time
-        img_path = os.path.join(images_folder, f"scene_{idx+1}.png")
-        audio_path = os.path.join(voiceover_folder, f"scene_{idx+1}.mp3")
-
-        if not os.path.exists(img_path):
-            print(f"Warning: Missing image {img_path}, skipping scene.")
+        scene_no = idx + 1
+        entry = assets.get(scene_no) or {"image": None, "voiceover": None}
+
+        if entry["image"] is None:
+            logger.warning(f"Missing image for scene {scene_no}, skipping scene.")
             continue
 
-        if not os.path.exists(audio_path):
-            print(f"Warning: Missing voiceover {audio_path}, skipping scene.")
+        if entry["voiceover"] is None:
+            logger.warning(f"Missing voiceover for scene {scene_no}, skipping scene.")
             continue
 
-        # Load the image and voiceover
-        # img_clip = mp.ImageClip(img_path)
-        img_clip = mp.ImageClip(img_path).set_duration(duration)
-        img_clip = apply_ken_burns(img_clip)
-        audio_clip = mp.AudioFileClip(audio_path)
-
-        # Set duration of the image clip to match the audio length
-        img_clip = img_clip.set_duration(audio_clip.duration).set_audio(audio_clip)
-
-        # Apply transition effects based on script
-        transition = scene.get("suggested_transition_effect", "fade-in").lower()
-        if transition == "fade-in":
-            img_clip = fadein.fadein(img_clip, 1)  # 1-second fade-in
-        elif transition == "crossfade":
-            img_clip = fadeout.fadeout(img_clip, 1).fx(fadein.fadein, 1)  # Smooth fade transition
-        elif transition == "zoom out":
-            img_clip = resize.resize(img_clip, lambda t: 1 + 0.05 * t)  # Zoom-out effect
-        elif transition == "quick cuts":
-            img_clip = fadeout.fadeout(img_clip, 0.5)  # Quick fade-out
-
-        clips.append(img_clip)
-
-    if not clips:
+        plan.append({
+            "scene": scene_no,
+            "image": entry["image"],
+            "frames": entry.get("frames"),
+            "audio": entry["voiceover"],
+            "duration": assets.duration(scene_no),
+            "transition": scene.get("suggested_transition_effect", "fade-in").lower(),
+            "ken_burns": choose_ken_burns(rng),
+        })
+    return plan
+
+
+def resolve_renderer(renderer, n_scenes):
+    """The renderer create_final_video uses for `n_scenes` scenes: one filter
+    graph gets too large past RENDER_GRAPH_MAX_SCENES, so "ffmpeg" streams instead."""
+    renderer = renderer or VIDEO_RENDERER
+    if renderer == "ffmpeg" and n_scenes > RENDER_GRAPH_MAX_SCENES:
+        return "streaming"
+    return renderer
+
+
+def create_final_video(script_data, images_folder, voiceover_folder, bg_music_path, output_video_path, renderer=None, seed=None, fragmented=False, assets=None, size=None, music_duration=None):
+    """Creates the final video using generated images, voiceovers, and background music.
+
+    `renderer` is "ffmpeg" (single native filter graph, switched to
+    "streaming" past RENDER_GRAPH_MAX_SCENES scenes), "parallel" (per-scene
+    segments on a worker pool, then concat), "streaming" (one scene in memory
+    at a time) or "moviepy"; it defaults to VIDEO_RENDERER. If an ffmpeg
+    render fails, MoviePy is used instead, unless a `fragmented` render had
+    already written bytes that readers may be following. Passing
+    a `seed` makes the Ken Burns motions, and so the frames, reproducible.
+    `fragmented` writes a fragmented MP4 that can be streamed while it renders.
+    `assets` is the run's AssetIndex, if the caller already has one.
+    `size` is the output frame size and defaults to VIDEO_SIZE.
+    `music_duration` is the track length recorded in music.json, so the
+    renderers loop and trim the music without probing the file.
+    """
+    rng = random.Random(seed) if seed is not None else random
+    plan = plan_scenes(script_data, images_folder, voiceover_folder, rng=rng, assets=assets)
+    if not plan:
         raise ValueError("No valid video clips created. Check if images and audio exist.")
 
-    # Merge all clips into a single video
-    final_video = mp.concatenate_videoclips(clips, method="compose")
+    renderer = resolve_renderer(renderer, len(plan))
+    size = size or VIDEO_SIZE
+    ffmpeg_renderers = {"ffmpeg": render_with_ffmpeg, "parallel": render_parallel, "streaming": render_streaming}
+    if renderer in ffmpeg_renderers:
+        try:
+            ffmpeg_renderers[renderer](plan, bg_music_path, output_video_path, size=size, fragmented=fragmented, music_duration=music_duration)
+            return
+        except Exception as e:
+            if fragmented and os.path.exists(output_video_path) and os.path.getsize(output_video_path) > 0:
+                # The partial file may already be streaming; a second MP4 written over it would corrupt the stream
+                logger.error(f"{renderer} render failed after it started writing {output_video_path}: {e}")
+                raise
+            logger.error(f"{renderer} render failed, falling back to MoviePy: {e}")
+    render_with_moviepy(plan, bg_music_path, output_video_path, size=size, fragmented=fragmented, music_duration=music_duration)
+
+
+def render_with_moviepy(plan, bg_music_path, output_video_path, size=None, fragmented=False, music_duration=None):
+    """Render a scene plan by composing MoviePy clips frame by frame in Python.
+
+    Every scene is a KenBurnsClip of the same size, so clips are chained
+    directly instead of being blitted onto a compose canvas. Scenes with a
+    normalized array are memory-mapped instead of decoding the PNG. MoviePy is
+    only imported here, so the service starts without it.
+    """
+    import moviepy.editor as mp
+    from moviepy.video.fx import fadein, fadeout
+    from backend.ken_burns import KenBurnsClip, transition_zoom_rate
 
-    # Add background music if available
-    if os.path.exists(bg_music_path):
-        bg_music = mp.AudioFileClip(bg_music_path).volumex(0.3)  # Reduce music volume
-        final_audio = mp.CompositeAudioClip([final_video.audio, bg_music])
-        final_video = final_video.set_audio(final_audio)
-
-    # Export final video
-    final_video.write_videofile(output_video_path, fps=24, codec="libx264", audio_codec="aac")
+    clips = []  # List to store video clips
+    readers = []  # Audio readers (an ffmpeg subprocess each), closed once the file is written
+    size = size or image_size(plan[0]["image"])
+
+    try:
+        for entry in plan:
+            # Load the image and voiceover, image duration matches the voiceover length
+            # The "zoom out" transition is part of the frame transform, as in the ffmpeg renderers
+            img_clip = KenBurnsClip(
+                entry.get("frames") or entry["image"], entry["duration"], entry["ken_burns"], size=size,
+                zoom_rate=transition_zoom_rate(entry["transition"]),
+            )
+            audio_clip = mp.AudioFileClip(entry["audio"])
+            readers.append(audio_clip)
+            img_clip = img_clip.set_audio(audio_clip.set_duration(min(entry["duration"], audio_clip.duration)))
+
+            # Apply transition effects based on script
+            transition = entry["transition"]
+            if transition == "fade-in":
+                img_clip = fadein.fadein(img_clip, 1)  # 1-second fade-in
+            elif transition == "crossfade":
+                img_clip = fadeout.fadeout(img_clip, 1).fx(fadein.fadein, 1)  # Smooth fade transition
+            elif transition == "quick cuts":
+                img_clip = fadeout.fadeout(img_clip, 0.5)  # Quick fade-out
+
+            clips.append(img_clip)
+
+        # Merge all clips into a single video
+        final_video = mp.concatenate_videoclips(clips, method="chain")
+
+        # Add background music if available, looped or trimmed to the timeline
+        if bg_music_path and os.path.exists(bg_music_path):
+            bg_music = mp.AudioFileClip(bg_music_path)
+            readers.append(bg_music)
+            bg_music = bg_music.volumex(0.3)  # Reduce music volume
+            if music_duration:
+                bg_music = bg_music.set_duration(music_duration)  # the recorded length, not MoviePy's estimate
+            if bg_music.duration < final_video.duration:
+                bg_music = mp.afx.audio_loop(bg_music, duration=final_video.duration)
+            else:
+                bg_music = bg_music.set_duration(final_video.duration)
+            final_audio = mp.CompositeAudioClip([final_video.audio, bg_music])
+            final_video = final_video.set_audio(final_audio)
+
+        # Export final video
+        ffmpeg_params = ["-movflags", FRAGMENTED_MOVFLAGS] if fragmented else None
+        final_video.write_videofile(output_video_path, fps=24, codec="libx264", audio_codec="aac", ffmpeg_params=ffmpeg_params)
+    finally:
+        for reader in readers:
+            reader.close()
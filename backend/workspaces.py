@@ -0,0 +1,166 @@
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from backend.logging_config import setup_logging
+
+logger = setup_logging(log_file='app.log')
+
+
+# Idle runs older than this are deleted by the reaper
+RUN_TTL_SECONDS = float(os.getenv('RUN_TTL_SECONDS', str(24 * 3600)))
+
+# Total scratch space all run workspaces may use; new runs are refused above it
+RUN_DISK_QUOTA_BYTES = int(os.getenv('RUN_DISK_QUOTA_BYTES', str(20 * 1024 ** 3)))
+
+# How often the background reaper wakes up
+REAPER_INTERVAL_SECONDS = float(os.getenv('REAPER_INTERVAL_SECONDS', '300'))
+
+
+class WorkspaceFull(Exception):
+    """Raised when scratch usage is over quota and nothing can be reaped."""
+
+
+class RunBusy(Exception):
+    """Raised when a run's workspace is already held by another job."""
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class WorkspaceManager:
+    """Per-run scratch directories under one root, bounded by a TTL and a disk quota.
+
+    A run holds its workspace for as long as it is inside `acquire`, and only
+    one job can hold a run at a time; active workspaces are never reaped. Idle workspaces are deleted once their last
+    use is older than `ttl`, and the least recently used ones go first when
+    total usage exceeds `quota`.
+    """
+
+    def __init__(self, root, ttl=RUN_TTL_SECONDS, quota=RUN_DISK_QUOTA_BYTES):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.quota = quota
+        self.reaped = 0
+        self._lock = threading.Lock()
+        self._active = set()  # run ids currently held
+        self._stop = threading.Event()
+        self._thread = None
+
+    def path_for(self, run_id):
+        return self.root / run_id
+
+    def is_active(self, run_id):
+        """True while a job holds the workspace of `run_id`."""
+        with self._lock:
+            return run_id in self._active
+
+    @contextmanager
+    def acquire(self, run_id):
+        """Hold the workspace for `run_id` and yield its directory, creating it if needed.
+
+        Raises RunBusy if another job holds it: two jobs building in one
+        workspace would overwrite each other's manifest and partial render.
+        """
+        with self._lock:
+            if run_id in self._active:
+                raise RunBusy(f"Run {run_id} is already in progress.")
+            self._active.add(run_id)
+        try:
+            if not self.has_room():
+                raise WorkspaceFull(f"Run workspaces are over their {self.quota} byte quota.")
+            run_dir = self.path_for(run_id)
+            run_dir.mkdir(parents=True, exist_ok=True)
+            os.utime(run_dir)
+            yield run_dir
+        finally:
+            with self._lock:
+                self._active.discard(run_id)
+            # Mark the end of the run as its last use for the TTL
+            if self.path_for(run_id).exists():
+                os.utime(self.path_for(run_id))
+
+    def has_room(self):
+        """True if usage is within quota, reaping idle workspaces first if it is not."""
+        if self.usage()["bytes"] <= self.quota:
+            return True
+        self.reap()
+        return self.usage()["bytes"] <= self.quota
+
+    def _workspaces(self):
+        """(last_used, run_id, bytes) for every workspace, oldest first."""
+        if not self.root.exists():
+            return []
+        workspaces = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir(follow_symlinks=False):
+                try:
+                    last_used = entry.stat(follow_symlinks=False).st_mtime
+                except FileNotFoundError:
+                    continue
+                workspaces.append((last_used, entry.name, _dir_size(entry.path)))
+        return sorted(workspaces)
+
+    def usage(self):
+        workspaces = self._workspaces()
+        with self._lock:
+            active = len(self._active)
+        return {
+            "runs": len(workspaces),
+            "active": active,
+            "bytes": sum(size for _, _, size in workspaces),
+            "quota_bytes": self.quota,
+            "ttl_seconds": self.ttl,
+            "reaped": self.reaped,
+        }
+
+    def reap(self, now=None):
+        """Delete expired idle workspaces, then the oldest idle ones while over quota."""
+        now = now or time.time()
+        workspaces = self._workspaces()
+        total = sum(size for _, _, size in workspaces)
+        removed = []
+        for last_used, run_id, size in workspaces:
+            expired = now - last_used > self.ttl
+            if not expired and total <= self.quota:
+                continue
+            with self._lock:
+                if run_id in self._active:
+                    continue
+                shutil.rmtree(self.path_for(run_id), ignore_errors=True)
+            total -= size
+            removed.append(run_id)
+            self.reaped += 1
+            logger.info(f"Reaped run workspace {run_id} ({'expired' if expired else 'over quota'}, {size} bytes)")
+        return removed
+
+    def start_reaper(self, interval=REAPER_INTERVAL_SECONDS):
+        """Run `reap` every `interval` seconds on a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._reaper_loop, args=(interval,), name="workspace-reaper", daemon=True)
+        self._thread.start()
+
+    def stop_reaper(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _reaper_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"Workspace reaper failed: {e}")
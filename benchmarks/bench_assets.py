@@ -0,0 +1,83 @@
+"""Compare scene-asset lookup by per-scene directory scan against the AssetIndex.
+
+The scan baseline is what get_closest_file used to do for every scene: list
+the folder and regex-match every name. The index scans each folder once.
+
+Usage: python -m benchmarks.bench_assets --scenes 500
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from backend.assets import AssetIndex
+from backend.audio_generator import VOICEOVER_MANIFEST
+from backend.video_generator import plan_scenes
+from benchmarks.fixtures import fake_script
+
+
+def scan_lookup(folder, scene_no, prefix, extension):
+    numbers = []
+    for name in os.listdir(folder):
+        match = re.search(rf"{prefix}_(\d+)\.{extension}$", name)
+        if match:
+            numbers.append(int(match.group(1)))
+    closest = min(numbers, key=lambda n: abs(n - scene_no))
+    return os.path.join(folder, f"{prefix}_{closest}.{extension}")
+
+
+def make_files(root, n_scenes):
+    """Empty scene files plus a voiceover manifest; lookups never read them."""
+    images_dir, audio_dir = Path(root) / "output_images", Path(root) / "output_audio"
+    images_dir.mkdir()
+    audio_dir.mkdir()
+    for i in range(1, n_scenes + 1):
+        (images_dir / f"scene_{i}.png").touch()
+        (audio_dir / f"scene_{i}.mp3").touch()
+    scenes = {str(i): {"file": f"scene_{i}.mp3", "duration": 3.0} for i in range(1, n_scenes + 1)}
+    (audio_dir / VOICEOVER_MANIFEST).write_text(json.dumps({"scenes": scenes}))
+    return str(images_dir), str(audio_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        images_dir, audio_dir = make_files(root, args.scenes)
+
+        start = time.perf_counter()
+        for i in range(1, args.scenes + 1):
+            scan_lookup(images_dir, i, "scene", "png")
+            scan_lookup(audio_dir, i, "scene", "mp3")
+        scan_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = AssetIndex.from_folders(images_dir, audio_dir)
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(1, args.scenes + 1):
+            index.get(i)
+        lookup_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        plan = plan_scenes(fake_script(args.scenes), images_dir, audio_dir)
+        plan_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "scenes": args.scenes,
+        "per_scene_scan_s": round(scan_s, 4),
+        "index_build_s": round(build_s, 4),
+        "index_lookups_s": round(lookup_s, 6),
+        "plan_scenes_s": round(plan_s, 4),
+        "planned": len(plan),
+        "speedup": round(scan_s / (build_s + lookup_s), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
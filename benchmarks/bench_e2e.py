@@ -0,0 +1,288 @@
+"""End-to-end pipeline benchmark with local stand-ins for every external service.
+
+Gemini is replaced by the stub script model, the Hugging Face image and music
+endpoints by local stub servers answering with PNG and FLAC payloads, and gTTS
+by the fake TTS backend. Each measurement runs in a fresh subprocess so peak
+RSS (including ffmpeg children) is isolated:
+
+  stages  calls each stage function in turn for one topic and reports wall
+          time, CPU time and peak RSS per stage plus the render fps
+  api     serves the app with uvicorn and sends M concurrent POST /generate_video/
+          requests, reporting latency, per-stage wall time, throughput and fps
+  batch   serves the app and POSTs N topics to /batches/ in one request,
+          reporting when each streamed result arrived and the throughput
+
+The JSON result carries the commit it was measured on, so runs on different
+commits can be diffed directly.
+
+Usage: python -m benchmarks.bench_e2e --scenes 6 --concurrency 1 2 4 --batch 8 --latency 0.5 --output e2e.json
+"""
+import argparse
+import functools
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.fixtures import make_flac_payload, make_png_payload
+from benchmarks.stub_server import StubInferenceServer
+
+
+def _usage():
+    """(CPU seconds, peak RSS MB) of this process and its finished children so far."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    return cpu, max(own.ru_maxrss, children.ru_maxrss) / 1024
+
+
+def _frames(video_path):
+    import imageio_ffmpeg
+    return imageio_ffmpeg.count_frames_and_secs(str(video_path))[0]
+
+
+def _install_stubs(config):
+    """Point the registries at the offline stand-ins; must run before the first model/backend is built."""
+    from backend import runs, script_models, tts_backends
+
+    script_models.MODELS["stub"] = functools.partial(
+        script_models.StubScriptModel, n_scenes=config["scenes"], latency=config["script_latency"])
+    tts_backends.BACKENDS["fake"] = functools.partial(tts_backends.FakeTTSBackend, latency=config["tts_latency"])
+    runs.workspaces.root = Path(config["root"]) / "runs"
+
+
+def run_stages(config):
+    """Call every stage function once, in pipeline order, and measure each."""
+    from backend.text_generator import ScriptService
+    from backend.image_generator import generate_images_from_script
+    from backend.audio_generator import generate_audio
+    from backend.music_generator import generate_music, generate_music_prompt
+    from backend.video_generator import create_final_video, resolve_renderer, VIDEO_RENDERER, VIDEO_SIZE
+    from backend.assets import AssetIndex
+    from backend.image_normalizer import normalize_images, normalized_path
+
+    _install_stubs(config)
+    root = Path(config["root"])
+    stages = {}
+
+    def measure(name, func):
+        cpu_before, _ = _usage()
+        start = time.perf_counter()
+        result = func()
+        wall = time.perf_counter() - start
+        cpu_after, peak = _usage()
+        stages[name] = {"wall_s": round(wall, 3), "cpu_s": round(cpu_after - cpu_before, 3), "peak_rss_mb": round(peak, 1)}
+        return result
+
+    script = measure("script", lambda: ScriptService(cache=None).generate("benchmark topic"))
+    measure("images", lambda: generate_images_from_script(script, root / "output_images", use_cache=False))
+    measure("voiceover", lambda: generate_audio(script, root / "output_audio", use_cache=False))
+    prompt = generate_music_prompt(script["background_music_prompt"], script["scenes"], script["overall_video_mood"])
+    info = measure("music", lambda: generate_music(prompt, root / "output_music"))
+    music_path = str(root / "output_music" / info["file"]) if info else None
+    assets = AssetIndex.from_folders(root / "output_images", root / "output_audio")
+    jobs = [(i, entry["image"], normalized_path(entry["image"], VIDEO_SIZE)) for i, entry in assets.scenes.items() if entry["image"]] if VIDEO_SIZE else []
+    # Same rule as the pipeline: only the streaming and MoviePy renderers read the arrays
+    if jobs and resolve_renderer(VIDEO_RENDERER, len(jobs)) in ("streaming", "moviepy"):
+        for i, path in measure("normalize", lambda: normalize_images(jobs, VIDEO_SIZE)).items():
+            assets.add_frames(i, path)
+    video_path = root / "final_video.mp4"
+    measure("render", lambda: create_final_video(script, str(root / "output_images"), str(root / "output_audio"), music_path, str(video_path), seed=0, assets=assets, music_duration=info["duration"] if info else None))
+
+    frames = _frames(video_path)
+    return {
+        "stages": stages,
+        "frames": frames,
+        "render_fps": round(frames / stages["render"]["wall_s"], 1),
+        "wall_s": round(sum(stage["wall_s"] for stage in stages.values()), 3),
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_api(config):
+    """Serve the app and send `concurrency` simultaneous /generate_video/ requests."""
+    import requests
+    import uvicorn
+
+    _install_stubs(config)
+    from backend.main import app
+
+    root = Path(config["root"])
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=_free_port(), log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{server.config.port}/generate_video/"
+
+    def request(i):
+        start = time.perf_counter()
+        response = requests.post(url, data={"topic": f"benchmark topic {i}", "use_script_cache": "false"}, timeout=3600)
+        latency = time.perf_counter() - start
+        if response.headers.get("Content-Type") != "video/mp4":
+            return {"latency_s": round(latency, 3), "error": response.text[:200]}
+        video_path = root / f"video_{i}.mp4"
+        video_path.write_bytes(response.content)
+        return {"latency_s": round(latency, 3), "stages_s": json.loads(response.headers.get("X-Stage-Timings", "{}")), "video": video_path}
+
+    cpu_before, _ = _usage()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=config["concurrency"]) as pool:
+        results = list(pool.map(request, range(config["concurrency"])))
+    wall = time.perf_counter() - start
+    cpu_after, peak = _usage()
+    server.should_exit = True
+    thread.join()
+
+    ok = [r for r in results if "error" not in r]
+    # Counted after the clock stops; decoding the outputs is not part of the workload
+    for r in ok:
+        render = r["stages_s"].get("render")
+        r["render_fps"] = round(_frames(r.pop("video")) / render, 1) if render else None
+    stage_names = sorted({name for r in ok for name in r["stages_s"]})
+    return {
+        "concurrency": config["concurrency"],
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu_after - cpu_before, 3),
+        "peak_rss_mb": round(peak, 1),
+        "completed": len(ok),
+        "errors": [r["error"] for r in results if "error" in r],
+        "videos_per_hour": round(len(ok) / wall * 3600, 1),
+        "latency_mean_s": round(sum(r["latency_s"] for r in ok) / len(ok), 3) if ok else None,
+        "latency_max_s": max((r["latency_s"] for r in ok), default=None),
+        "stage_mean_s": {name: round(sum(r["stages_s"].get(name, 0) for r in ok) / len(ok), 3) for name in stage_names},
+        "render_fps_mean": round(sum(r["render_fps"] or 0 for r in ok) / len(ok), 1) if ok else None,
+    }
+
+
+def run_batch(config):
+    """Serve the app and generate `batch` topics with one streamed POST /batches/ request."""
+    import requests
+    import uvicorn
+
+    _install_stubs(config)
+    from backend.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=_free_port(), log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{server.config.port}/batches/"
+
+    topics = [f"benchmark topic {i}" for i in range(config["batch"])]
+    arrivals, summary = [], None
+    cpu_before, _ = _usage()
+    start = time.perf_counter()
+    with requests.post(url, data={"topics": topics, "use_script_cache": "false"}, stream=True, timeout=3600) as response:
+        for line in response.iter_lines():
+            message = json.loads(line)
+            if "index" in message:
+                arrivals.append({"at_s": round(time.perf_counter() - start, 3), "status": message["status"], "error": message["error"]})
+            elif "videos_per_hour" in message:
+                summary = message
+    wall = time.perf_counter() - start
+    cpu_after, peak = _usage()
+    server.should_exit = True
+    thread.join()
+
+    return {
+        "topics": config["batch"],
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu_after - cpu_before, 3),
+        "peak_rss_mb": round(peak, 1),
+        "completed": sum(1 for a in arrivals if a["status"] == "done"),
+        "errors": [a["error"] for a in arrivals if a["error"]],
+        "first_result_s": arrivals[0]["at_s"] if arrivals else None,
+        "result_arrivals_s": [a["at_s"] for a in arrivals],
+        "videos_per_hour": round(sum(1 for a in arrivals if a["status"] == "done") / wall * 3600, 1),
+        "server_summary": summary,
+    }
+
+
+WORKERS = {"stages": run_stages, "api": run_api, "batch": run_batch}
+
+
+def run_worker(mode, config, env):
+    """Run one measurement in a fresh interpreter; results come back through a file."""
+    with tempfile.TemporaryDirectory() as root:
+        config = dict(config, root=root)
+        result_path = Path(root) / "result.json"
+        env = dict(os.environ, **env,
+                   IMAGE_CACHE_DIR=str(Path(root) / "cache/images"),
+                   TTS_CACHE_DIR=str(Path(root) / "cache/tts"),
+                   SCRIPT_CACHE_BACKEND="memory")
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_e2e", "--worker", mode, json.dumps(config), str(result_path)],
+            check=True, env=env, cwd=Path(__file__).resolve().parent.parent,
+        )
+        return json.loads(result_path.read_text())
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--batch", type=int, default=4, help="topics sent to /batches/ in batch mode")
+    parser.add_argument("--latency", type=float, default=0.5, help="image endpoint latency (s)")
+    parser.add_argument("--music-latency", type=float, default=2.0)
+    parser.add_argument("--music-seconds", type=float, default=30.0)
+    parser.add_argument("--script-latency", type=float, default=1.0)
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--image-size", type=int, default=1024)
+    parser.add_argument("--modes", nargs="+", choices=list(WORKERS), default=list(WORKERS))
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--worker", nargs=3, metavar=("MODE", "CONFIG", "RESULT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, config, result_path = args.worker
+        Path(result_path).write_text(json.dumps(WORKERS[mode](json.loads(config))))
+        return
+
+    config = {"scenes": args.scenes, "script_latency": args.script_latency, "tts_latency": args.tts_latency}
+    image_payload = make_png_payload((args.image_size, args.image_size))
+    music_payload = make_flac_payload(args.music_seconds)
+    with StubInferenceServer(latency=args.latency, payload=image_payload) as images, \
+            StubInferenceServer(latency=args.music_latency, payload=music_payload, content_type="audio/flac") as music:
+        env = {"HF_API_URL_SD": images.url, "HF_API_URL_MUSICGEN": music.url, "SCRIPT_MODEL": "stub", "TTS_BACKEND": "fake"}
+        result = {
+            "commit": _commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cpu_count": os.cpu_count(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("worker", "output")},
+        }
+        if "stages" in args.modes:
+            result["stages"] = run_worker("stages", config, env)
+        if "api" in args.modes:
+            result["api"] = [run_worker("api", dict(config, concurrency=m), env) for m in args.concurrency]
+        if "batch" in args.modes:
+            result["batch"] = run_worker("batch", dict(config, batch=args.batch), env)
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare serial vs concurrent scene image generation against a local stub server.
+
+Usage: python -m benchmarks.bench_images --scenes 12 --latency 1.0 --max-in-flight 4
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from backend.image_generator import generate_images_from_script
+from backend.inference_client import inference_client
+from benchmarks.stub_server import StubInferenceServer
+
+
+def fake_script(n_scenes):
+    return {"scenes": [{"scene_description": f"scene {i}", "mood_emotion": "calm"} for i in range(n_scenes)]}
+
+
+def run(n_scenes, latency, max_in_flight, loading_responses=0):
+    script = fake_script(n_scenes)
+    with StubInferenceServer(latency=latency, loading_responses=loading_responses) as server:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            failed = generate_images_from_script(script, Path(tmp), max_in_flight=max_in_flight, api_url=server.url, use_cache=False)
+            elapsed = time.perf_counter() - start
+            written = len(list(Path(tmp).glob("scene_*.png")))
+        return {
+            "max_in_flight": max_in_flight,
+            "wall_s": round(elapsed, 3),
+            "written": written,
+            "failed": failed,
+            "requests": server.requests_served,
+            "connections": len(server.connections),
+            "client": inference_client.stats().get(server.url),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--loading-responses", type=int, default=0)
+    args = parser.parse_args()
+
+    serial = run(args.scenes, args.latency, 1, args.loading_responses)
+    concurrent = run(args.scenes, args.latency, args.max_in_flight, args.loading_responses)
+    print(json.dumps({
+        "scenes": args.scenes,
+        "latency_s": args.latency,
+        "serial": serial,
+        "concurrent": concurrent,
+        "speedup": round(serial["wall_s"] / concurrent["wall_s"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
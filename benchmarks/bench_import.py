@@ -0,0 +1,66 @@
+"""Measure the import time of backend.main with -X importtime and enforce a budget.
+
+Each sample imports the app in a fresh interpreter; the fastest sample is
+compared with the budget. Exits non-zero if the budget is exceeded or if a
+heavy dependency that should only load when its stage first runs (MoviePy,
+OpenCV, gTTS, Gemini, requests) was imported at startup.
+
+Usage: python -m benchmarks.bench_import --budget-ms 500 --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Modules that must not be imported by `import backend.main`
+LAZY_MODULES = ("moviepy", "cv2", "gtts", "google.generativeai", "requests", "numpy")
+
+# Default budget for `import backend.main`, in milliseconds
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '500'))
+
+
+def sample(module):
+    """(cumulative import time of `module` in ms, {module: self ms}, lazily-loaded modules that were imported)."""
+    code = f"import sys, json, {module}; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent.parent,
+    )
+    total, own = None, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        own[name.strip()] = int(self_us) / 1000
+        if name.strip() == module:
+            total = int(cumulative_us) / 1000
+    return total, own, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = [sample(args.module) for _ in range(args.runs)]
+    best_ms, own, eager = min(samples, key=lambda s: s[0])
+    report = {
+        "module": args.module,
+        "import_ms": round(best_ms, 1),
+        "samples_ms": [round(s[0], 1) for s in samples],
+        "budget_ms": args.budget_ms,
+        "eager_heavy_modules": eager,
+        "slowest_self_ms": {name: round(ms, 1) for name, ms in sorted(own.items(), key=lambda item: -item[1])[:args.top]},
+        "ok": best_ms <= args.budget_ms and not eager,
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Cost of rendering scenes from the SDXL PNGs vs from normalized, memory-mapped arrays.
+
+Writes N native-size images, normalizes them to the output size with the
+batched path, then builds every scene's Ken Burns frames both ways and
+reports per-scene setup time (decode + fit), per-frame time and how far the
+two sets of frames differ.
+
+Usage: python -m benchmarks.bench_normalize --scenes 8 --source 1024 --size 720x1280
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from backend.image_normalizer import normalize_images, normalized_path, parse_size
+from backend.ken_burns import KenBurnsFrames
+from benchmarks.fixtures import make_scene_assets
+
+EFFECTS = ["in", "out", "left", "right", "up", "down", None]
+
+
+def scene_frames(sources, size, seconds, fps):
+    """(setup seconds, frame seconds, one frame per scene) for building every scene from `sources`."""
+    setup = frame_time = 0.0
+    samples = []
+    for i, source in enumerate(sources):
+        motion = {"effect": EFFECTS[i % len(EFFECTS)], "zoom": 1.2}
+        start = time.perf_counter()
+        scene = KenBurnsFrames(source, seconds, motion, fps=fps, size=size)
+        setup += time.perf_counter() - start
+        start = time.perf_counter()
+        for n in range(int(seconds * fps)):
+            frame = scene.frame(n / fps)
+        frame_time += time.perf_counter() - start
+        samples.append(np.array(scene.frame(seconds / 2)))
+    return setup, frame_time, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=8)
+    parser.add_argument("--source", type=int, default=1024, help="side of the square source images")
+    parser.add_argument("--size", default="720x1280", help="output frame size, WIDTHxHEIGHT")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--fps", type=int, default=24)
+    args = parser.parse_args()
+    size = parse_size(args.size)
+
+    with tempfile.TemporaryDirectory() as root:
+        _, images_dir, _ = make_scene_assets(root, args.scenes, size=(args.source, args.source))
+        pngs = [images_dir / f"scene_{i}.png" for i in range(1, args.scenes + 1)]
+
+        start = time.perf_counter()
+        arrays = normalize_images([(i, png, normalized_path(png, size)) for i, png in enumerate(pngs, 1)], size)
+        normalize_s = time.perf_counter() - start
+
+        png_setup, png_frames, png_samples = scene_frames(pngs, size, args.seconds, args.fps)
+        npy_setup, npy_frames, npy_samples = scene_frames([arrays[i] for i in range(1, args.scenes + 1)], size, args.seconds, args.fps)
+
+    n_frames = args.scenes * int(args.seconds * args.fps)
+    diff = max(float(np.abs(a.astype(np.int16) - b).mean()) for a, b in zip(png_samples, npy_samples))
+    print(json.dumps({
+        "scenes": args.scenes,
+        "source": [args.source, args.source],
+        "size": list(size),
+        "normalize_s": round(normalize_s, 3),
+        "png": {"setup_ms_per_scene": round(png_setup / args.scenes * 1000, 2), "ms_per_frame": round(png_frames / n_frames * 1000, 3)},
+        "normalized": {"setup_ms_per_scene": round(npy_setup / args.scenes * 1000, 2), "ms_per_frame": round(npy_frames / n_frames * 1000, 3)},
+        "max_mean_abs_diff": round(diff, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
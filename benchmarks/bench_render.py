@@ -0,0 +1,85 @@
+"""Compare the MoviePy, ffmpeg and parallel renderers: frames per second and peak RSS.
+
+Each render runs in a fresh subprocess so peak RSS (including the ffmpeg
+child) is measured in isolation.
+
+Usage: python -m benchmarks.bench_render --scenes 6 --size 1024 --renderers moviepy ffmpeg streaming parallel:1 parallel:8
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import make_scene_assets
+
+
+def render_once(renderer, root, n_scenes, fps, seed):
+    """Worker entry point: render the prepared assets and report timings."""
+    from backend.video_generator import plan_scenes, render_with_moviepy
+    from backend.ffmpeg_renderer import render_with_ffmpeg, render_parallel, render_streaming
+    from benchmarks.fixtures import fake_script
+
+    root = Path(root)
+    plan = plan_scenes(fake_script(n_scenes), str(root / "output_images"), str(root / "output_audio"), rng=random.Random(seed))
+    output = root / f"final_{renderer.replace(':', '_')}.mp4"
+    start = time.perf_counter()
+    if renderer == "ffmpeg":
+        render_with_ffmpeg(plan, None, output, fps=fps)
+    elif renderer == "streaming":
+        render_streaming(plan, None, output, fps=fps)
+    elif renderer.startswith("parallel"):
+        # "parallel" uses every core, "parallel:N" uses N workers
+        workers = int(renderer.split(":")[1]) if ":" in renderer else os.cpu_count()
+        render_parallel(plan, None, output, fps=fps, workers=workers)
+    else:
+        render_with_moviepy(plan, "", str(output))
+    elapsed = time.perf_counter() - start
+    frames = sum(round(entry["duration"] * fps) for entry in plan)
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        "renderer": renderer,
+        "wall_s": round(elapsed, 3),
+        "frames": frames,
+        "fps": round(frames / elapsed, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=6)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--renderers", nargs="+", default=["moviepy", "ffmpeg"])
+    parser.add_argument("--worker", nargs=2, metavar=("RENDERER", "ROOT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(render_once(args.worker[0], args.worker[1], args.scenes, args.fps, args.seed)))
+        return
+
+    with tempfile.TemporaryDirectory() as root:
+        make_scene_assets(root, args.scenes, size=(args.size, args.size), seed=args.seed)
+        results = []
+        for renderer in args.renderers:
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_render", "--scenes", str(args.scenes), "--fps", str(args.fps),
+                 "--seed", str(args.seed), "--worker", renderer, root],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                results.append({"renderer": renderer, "error": proc.stderr.strip().splitlines()[-1:]})
+            else:
+                results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    print(json.dumps({"scenes": args.scenes, "size": args.size, "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
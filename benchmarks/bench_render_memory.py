@@ -0,0 +1,54 @@
+"""Check that a renderer's peak RSS does not grow with the number of scenes.
+
+Renders a short and a long timeline (50+ scenes by default) in fresh
+subprocesses via benchmarks.bench_render and compares their peak RSS,
+including the ffmpeg children. Exits non-zero if the long render needs more
+than `--tolerance` more memory than the short one.
+
+Usage: python -m benchmarks.bench_render_memory --scenes 10 60 --size 512 --renderer streaming
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.fixtures import make_scene_assets
+
+
+def peak_rss(renderer, n_scenes, size, fps):
+    with tempfile.TemporaryDirectory() as root:
+        make_scene_assets(root, n_scenes, size=(size, size))
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_render", "--scenes", str(n_scenes), "--fps", str(fps), "--worker", renderer, root],
+            capture_output=True, text=True, check=True,
+        )
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, nargs=2, default=[10, 60], metavar=("SHORT", "LONG"))
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--renderer", default="streaming")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative RSS growth")
+    args = parser.parse_args()
+
+    short, long = (peak_rss(args.renderer, n, args.size, args.fps) for n in args.scenes)
+    growth = long["peak_rss_mb"] / short["peak_rss_mb"] - 1
+    report = {
+        "renderer": args.renderer,
+        "size": args.size,
+        "short": dict(short, scenes=args.scenes[0]),
+        "long": dict(long, scenes=args.scenes[1]),
+        "rss_growth": round(growth, 3),
+        "tolerance": args.tolerance,
+        "ok": growth <= args.tolerance,
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compare serial vs concurrent script generation for a batch of topics on the stub model.
+
+Usage: python -m benchmarks.bench_scripts --topics 50 --latency 2.0 --workers 8
+"""
+import argparse
+import json
+import time
+
+from backend.script_models import StubScriptModel
+from backend.text_generator import ScriptService
+
+
+def run(n_topics, latency, workers, failure_rate):
+    model = StubScriptModel(latency=latency, failure_rate=failure_rate, seed=0)
+    service = ScriptService(model=model, workers=workers, backoff_base=0.05, cache=None)
+    first_scene = []
+
+    start = time.perf_counter()
+    service.generate("warm-up", on_scene=lambda i, scene: first_scene.append(time.perf_counter() - start) if i == 0 else None)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = service.generate_many([f"topic {i}" for i in range(n_topics)])
+    elapsed = time.perf_counter() - start
+    return {
+        "workers": workers,
+        "wall_s": round(elapsed, 3),
+        "topics_per_min": round(n_topics / elapsed * 60, 1),
+        "failed": sum(r["error"] is not None for r in results),
+        "model_calls": model.calls,
+        "first_scene_s": round(first_scene[0], 3),
+        "full_script_s": round(single, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    serial = run(args.topics, args.latency, 1, args.failure_rate)
+    concurrent = run(args.topics, args.latency, args.workers, args.failure_rate)
+    print(json.dumps({
+        "topics": args.topics,
+        "latency_s": args.latency,
+        "serial": serial,
+        "concurrent": concurrent,
+        "speedup": round(serial["wall_s"] / concurrent["wall_s"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
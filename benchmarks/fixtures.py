@@ -0,0 +1,83 @@
+"""Synthetic scene assets (images, voiceover, music) for the benchmarks."""
+import io
+import os
+import random
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from backend.audio_generator import generate_audio
+from backend.ffmpeg_renderer import ffmpeg_binary
+from backend.tts_backends import FakeTTSBackend
+
+TRANSITIONS = ["fade-in", "crossfade", "quick cuts", "fade-in"]
+
+
+def fake_script(n_scenes, words_per_line=12):
+    """Script JSON shaped like the Gemini output, with deterministic content."""
+    return {
+        "video_title": "Benchmark",
+        "scenes": [
+            {
+                "timestamp": f"00:{i * 10 % 60:02d} - 00:{(i * 10 + 10) % 60:02d}",
+                "voiceover": " ".join(f"word{i}_{j}" for j in range(words_per_line)),
+                "scene_description": f"Benchmark scene {i}",
+                "character_object_details": "A lone lighthouse",
+                "shot_type_camera_angle": "Wide shot",
+                "mood_emotion": "calm",
+                "suggested_transition_effect": TRANSITIONS[i % len(TRANSITIONS)],
+            }
+            for i in range(n_scenes)
+        ],
+        "overall_video_mood": "calm",
+        "background_music_prompt": "Ambient piano",
+    }
+
+
+def scene_pixels(size, rng, offset=0):
+    """Smooth gradient + noise so the encoder does representative work."""
+    gradient = np.linspace(0, 255, size[0], dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 20, (size[1], size[0], 3)).astype(np.float32)
+    return np.clip(gradient + noise + offset, 0, 255).astype(np.uint8)
+
+
+def make_png_payload(size=(1024, 1024), seed=0):
+    """PNG bytes of a scene-like image, as a text-to-image endpoint would answer."""
+    buffer = io.BytesIO()
+    Image.fromarray(scene_pixels(size, np.random.default_rng(seed))).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_flac_payload(seconds=30.0):
+    """FLAC bytes of a tone, shaped like a MusicGen answer (STREAMINFO carries the length)."""
+    fd, path = tempfile.mkstemp(suffix=".flac")
+    os.close(fd)
+    try:
+        # Written to a file, not a pipe, so ffmpeg can seek back and fill in the sample count
+        subprocess.run(
+            [ffmpeg_binary(), "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}", "-c:a", "flac", path],
+            check=True,
+        )
+        return Path(path).read_bytes()
+    finally:
+        os.unlink(path)
+
+
+def make_scene_assets(root, n_scenes, size=(1024, 1024), seed=0):
+    """Write scene_{i}.png and scene_{i}.mp3 under root; returns (script, images_dir, audio_dir)."""
+    root = Path(root)
+    images_dir = root / "output_images"
+    audio_dir = root / "output_audio"
+    images_dir.mkdir(parents=True, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    script = fake_script(n_scenes)
+    for i in range(n_scenes):
+        pixels = scene_pixels(size, rng, random.Random(seed + i).randint(0, 80))
+        Image.fromarray(pixels).save(images_dir / f"scene_{i+1}.png")
+
+    generate_audio(script, audio_dir, backend=FakeTTSBackend(), use_cache=False)
+    return script, images_dir, audio_dir
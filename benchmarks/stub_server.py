@@ -0,0 +1,88 @@
+"""Local stand-in for the Hugging Face inference API, used by the benchmarks.
+
+Every POST sleeps for `latency` seconds and answers with a small PNG. The first
+`loading_responses` requests get a 503 "model is loading" reply so the retry
+path is exercised as well.
+"""
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_png(width=64, height=64, color=(120, 80, 200)):
+    """Build a solid-colour RGB PNG without any imaging dependency."""
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes(color) * width
+    raw = row * height
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+class StubInferenceServer:
+    """Threaded HTTP server that fakes a slow text-to-image endpoint."""
+
+    def __init__(self, latency=1.0, loading_responses=0, payload=None, content_type="image/png"):
+        self.latency = latency
+        self.loading_responses = loading_responses
+        self.payload = payload if payload is not None else make_png()
+        self.content_type = content_type
+        self.requests_served = 0
+        self.connections = set()  # client (host, port) pairs seen, i.e. TCP connections opened
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real inference API
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                with stub._lock:
+                    stub.requests_served += 1
+                    stub.connections.add(self.client_address)
+                    loading = stub.requests_served <= stub.loading_responses
+                time.sleep(stub.latency)
+                if loading:
+                    body = b'{"error": "Model is currently loading", "estimated_time": 0.1}'
+                    self.send_response(503)
+                    self.send_header("Content-Type", "application/json")
+                else:
+                    body = stub.payload
+                    self.send_response(200)
+                    self.send_header("Content-Type", stub.content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()